@@ -0,0 +1,34 @@
+"""
+Shared fixtures for the live-server separation tests.
+They run against a PianoMaker backend at sep_client.BASE_URL, in parallel with pytest-xdist:
+
+    pytest -n 4 test_great_quality.py test_separation_fixed.py test_separation_improved.py test_separation_modes.py
+"""
+
+import os
+
+import pytest
+import requests
+
+from sep_client import BASE_URL, SESSION, TEST_FILE, get_test_bytes, store_upload
+
+# Standalone scripts, not suite members: one runs every separation in-process,
+# the other targets a fixed LAN server
+collect_ignore = ["test_simple_separation.py", "test_backend.py"]
+
+@pytest.fixture(scope="session")
+def session():
+    """Keep-alive session shared by a worker's tests; skips them when the backend or test audio is missing"""
+    if not os.path.exists(TEST_FILE):
+        pytest.skip(f"Test file {TEST_FILE} not found")
+    try:
+        SESSION.get(f"{BASE_URL}/ping", timeout=5)
+    except requests.exceptions.RequestException:
+        pytest.skip(f"Backend not reachable at {BASE_URL}")
+    yield SESSION
+    SESSION.close()
+
+@pytest.fixture(scope="session")
+def file_id(session):
+    """Server-side handle of the test audio, uploaded once per worker"""
+    return store_upload(TEST_FILE, "audio/mpeg", payload=get_test_bytes(TEST_FILE), session=session)
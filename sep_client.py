@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Shared client helpers for the separation test scripts
+"""
+
+import json
+import os
+import time
+from contextlib import nullcontext
+
+import requests
+from requests.adapters import HTTPAdapter
+try:
+    from orjson import loads as _loads  # optional; faster decoding of status updates
+except ImportError:
+    _loads = json.loads
+try:
+    from requests_toolbelt import MultipartEncoder  # optional; streams uploads from disk
+except ImportError:
+    MultipartEncoder = None
+
+BASE_URL = "http://localhost:8010"
+# Endpoint that starts a separation job (multipart 'file' or 'file_id', plus 'mode')
+START_URL = f"{BASE_URL}/separate_audio"
+TEST_FILE = "01 - Dreamlover - Mariah Carey.mp3"
+
+# Retry pacing for failed status checks: double from BACKOFF_BASE up to BACKOFF_MAX,
+# give up after MAX_CONSECUTIVE_ERRORS failures in a row
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 60.0
+MAX_CONSECUTIVE_ERRORS = 10
+# Longest silence tolerated on the event stream; the server sends keep-alives every 5s,
+# so a longer gap means a stalled stream and the wait falls back to polling
+STREAM_READ_TIMEOUT = 15.0
+
+# One keep-alive connection pool shared by uploads and status checks
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=0))
+
+# Test-file contents keyed by (path, mtime), so repeated runs in one process read the disk once
+_TEST_BYTES = {}
+
+def get_test_bytes(path):
+    """Return the bytes of a test file (raises FileNotFoundError if it's missing)"""
+    key = (path, os.stat(path).st_mtime_ns)
+    data = _TEST_BYTES.get(key)
+    if data is None:
+        with open(path, 'rb') as f:
+            data = f.read()
+        _TEST_BYTES[key] = data
+    return data
+
+def upload(url, path, mime, data=None, payload=None, session=None):
+    """
+    POST a file as multipart/form-data under the 'file' field, with data as extra form fields.
+    With requests_toolbelt installed the body is streamed instead of assembled in memory;
+    payload lets callers pass bytes they have already read; session defaults to SESSION.
+    """
+    session = session or SESSION
+    fields = dict(data or {})
+    with (open(path, 'rb') if payload is None else nullcontext(payload)) as body:
+        if MultipartEncoder is not None:
+            encoder = MultipartEncoder(fields={**fields, 'file': (path, body, mime)})
+            return session.post(url, data=encoder, headers={'Content-Type': encoder.content_type})
+        return session.post(url, files={'file': (path, body, mime)}, data=fields)
+
+def store_upload(path, mime, payload=None, base_url=BASE_URL, session=None):
+    """Upload a file once to the server's /upload and return its file_id, so several jobs can start from it"""
+    response = upload(f"{base_url}/upload", path, mime, payload=payload, session=session)
+    response.raise_for_status()
+    return response.json()["file_id"]
+
+def _report_progress(status_data, last=None, log=print):
+    """Print a status line only when status/progress/backend changed since `last`; returns the new key"""
+    status = status_data.get('status')
+    progress = status_data.get('progress', 0)
+    current = (status, round(float(progress), 3), status_data.get('backend'))
+    if current != last:
+        log(f"   Status: {status}, Progress: {progress:.1%}")
+    return current
+
+def _job_state(status_data):
+    """Status/progress token matching the server's long-poll ?since= format"""
+    return f"{status_data.get('status')}:{round(float(status_data.get('progress', 0)), 3)}"
+
+def _poll_job(job_id, base_url, deadline, poll_interval, long_poll=30, log=print, session=None):
+    """
+    Fallback for servers without the event stream: long-poll /job/{id}.
+    The server holds each request until the state changes (or long_poll seconds pass);
+    servers that ignore ?wait= answer at once, so unchanged quick answers are paced by poll_interval.
+    Sends the last ETag as If-None-Match; an unchanged job comes back as an empty 304.
+    """
+    session = session or SESSION
+    status_url = f"{base_url}/job/{job_id}"
+    status_data = {}
+    last_state = None
+    last_report = None
+    last_etag = None
+    delay = BACKOFF_BASE
+    errors = 0
+    while time.time() < deadline:
+        wait = max(0, min(long_poll, deadline - time.time()))
+        params = {'wait': round(wait, 1)}
+        if last_state is not None:
+            params['since'] = last_state
+        headers = {'If-None-Match': last_etag} if last_etag else None
+        asked = time.time()
+        try:
+            status_response = session.get(status_url, params=params, headers=headers, timeout=wait + 5)
+            if status_response.status_code == 304:
+                # Nothing changed: no body to parse
+                delay = BACKOFF_BASE
+                errors = 0
+                if time.time() - asked < poll_interval:
+                    time.sleep(poll_interval)
+                continue
+            if status_response.status_code == 200:
+                delay = BACKOFF_BASE
+                errors = 0
+                last_etag = status_response.headers.get('ETag')
+                status_data = _loads(status_response.content)
+                state = _job_state(status_data)
+                last_report = _report_progress(status_data, last_report, log)
+                if state == last_state and time.time() - asked < poll_interval:
+                    time.sleep(poll_interval)
+                last_state = state
+                if status_data.get('status') in ('done', 'error'):
+                    return status_data['status'], status_data
+                continue
+            log(f"⚠️  Status check failed: {status_response.status_code}")
+        except Exception as e:
+            log(f"⚠️  Error checking status: {e}")
+
+        # Failed check: back off exponentially, give up on a persistently failing server
+        errors += 1
+        if errors >= MAX_CONSECUTIVE_ERRORS:
+            return 'error', {**status_data, 'error': f"{errors} consecutive status check failures"}
+        time.sleep(max(0, min(delay, deadline - time.time())))
+        delay = min(delay * 2, BACKOFF_MAX)
+    return 'timeout', status_data
+
+def wait_for_job(job_id, base_url=BASE_URL, timeout=300, poll_interval=2, log=print, session=None):
+    """
+    Wait for a job to finish and return (status, payload).
+    Subscribes to the server's event stream; falls back to polling /job/{id}
+    when the stream isn't available. status is 'timeout' if the job didn't finish.
+    Progress lines go through log (e.g. a list's append to buffer them per job);
+    session defaults to SESSION.
+    """
+    session = session or SESSION
+    deadline = time.time() + timeout
+    status_data = {}
+    last_report = None
+    try:
+        response = session.get(f"{base_url}/job/{job_id}/events", stream=True,
+                               headers={'Accept': 'text/event-stream'},
+                               timeout=(10, min(timeout, STREAM_READ_TIMEOUT)))
+    except requests.exceptions.RequestException as e:
+        log(f"⚠️  Event stream unavailable ({e}), polling instead")
+        return _poll_job(job_id, base_url, deadline, poll_interval, log=log, session=session)
+
+    with response:
+        if response.status_code in (404, 406):
+            return _poll_job(job_id, base_url, deadline, poll_interval, log=log, session=session)
+        try:
+            response.raise_for_status()
+            # Every line, keep-alive comments included, is a chance to check the deadline
+            for line in response.iter_lines():
+                if line.startswith(b'data:'):
+                    status_data = _loads(line[5:])
+                    last_report = _report_progress(status_data, last_report, log)
+                    if status_data.get('status') in ('done', 'error'):
+                        return status_data['status'], status_data
+                if time.time() >= deadline:
+                    break
+        except requests.exceptions.RequestException as e:
+            # Read timeouts (a stream silent for STREAM_READ_TIMEOUT) surface here too;
+            # only fall back if there's time left
+            if time.time() < deadline:
+                log(f"⚠️  Event stream failed ({e}), polling instead")
+                return _poll_job(job_id, base_url, deadline, poll_interval, log=log, session=session)
+
+    return 'timeout', status_data
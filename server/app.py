@@ -1,5 +1,6 @@
 import os
 import uuid
+import hashlib
 import shutil
 import json
 import threading
@@ -9,7 +10,7 @@ from typing import Optional
 import asyncio
 
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response, StreamingResponse
 from dotenv import load_dotenv
 from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
@@ -17,9 +18,9 @@ from fastapi.middleware.cors import CORSMiddleware
 import certifi as _certifi
 
 try:
-    from server.inference import OUTPUTS_DIR, transcribe_to_midi, transcribe_to_midi_pure_basic_pitch, transcribe_to_midi_hybrid, _convert_to_wav, render_midi_to_wav, perform_midi, perform_midi_ml, render_midi_to_wav_sfizz, trim_midi, melody_to_midi, piano_cover_from_audio_hq, piano_cover_from_audio_style, perform_audio_cloud
+    from server.inference import OUTPUTS_DIR, transcribe_to_midi, transcribe_to_midi_pure_basic_pitch, transcribe_to_midi_hybrid, _convert_to_wav, render_midi_to_wav, perform_midi, perform_midi_ml, render_midi_to_wav_sfizz, trim_midi, melody_to_midi, piano_cover_from_audio_hq, piano_cover_from_audio_style, perform_audio_cloud, _replicate_latest_version, _download_to_file, _poll_prediction, _basic_pitch_transcribe, _write_wav_pcm16
 except Exception:
-    from inference import OUTPUTS_DIR, transcribe_to_midi, transcribe_to_midi_pure_basic_pitch, transcribe_to_midi_hybrid, _convert_to_wav, render_midi_to_wav, perform_midi, perform_midi_ml, render_midi_to_wav_sfizz, trim_midi, melody_to_midi, piano_cover_from_audio_hq, piano_cover_from_audio_style, perform_audio_cloud
+    from inference import OUTPUTS_DIR, transcribe_to_midi, transcribe_to_midi_pure_basic_pitch, transcribe_to_midi_hybrid, _convert_to_wav, render_midi_to_wav, perform_midi, perform_midi_ml, render_midi_to_wav_sfizz, trim_midi, melody_to_midi, piano_cover_from_audio_hq, piano_cover_from_audio_style, perform_audio_cloud, _replicate_latest_version, _download_to_file, _poll_prediction, _basic_pitch_transcribe, _write_wav_pcm16
 import os as _os
 import sys
 try:
@@ -46,6 +47,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def warm_models():
+    """Load Basic Pitch in the background so the first transcription request doesn't
+    pay for TensorFlow start-up and model loading. Set WARM_BASIC_PITCH=0 to skip."""
+    if os.environ.get("WARM_BASIC_PITCH", "1") == "0":
+        return
+
+    def _warm():
+        import tempfile
+        import numpy as np
+        fd, path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        try:
+            # One short inference on silence also builds the model's compute graph
+            _write_wav_pcm16(path, np.zeros(22050, dtype=np.float32), 22050)
+            _basic_pitch_transcribe(path)
+            print("Basic Pitch model warmed up")
+        except Exception as e:
+            print(f"Basic Pitch warm-up skipped: {e}")
+        finally:
+            try:
+                os.remove(path)
+            except Exception:
+                pass
+
+    threading.Thread(target=_warm, daemon=True).start()
+
 @app.get("/ping")
 async def ping():
     return {"status": "ok"}
@@ -262,14 +290,15 @@ def _write_progress(job_dir: str, status: str, progress: float, error: str = Non
     except Exception as e:
         print(f"Failed to write progress: {e}")
 
-@app.get("/job/{job_id}")
-async def job_status(request: Request, job_id: str):
-    """Get job status and results."""
-    job_dir = os.path.join(OUTPUTS_DIR, job_id)
-    
-    if not os.path.exists(job_dir):
-        raise HTTPException(status_code=404, detail="Job not found")
-    
+def _mtime_or_now(path: str) -> float:
+    """Last write time of path, or now if it doesn't exist (keeps snapshot timestamps stable between polls)."""
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return time.time()
+
+def _job_snapshot(job_id: str, job_dir: str, base_url: str) -> dict:
+    """Build the status/results payload for a job from its output directory."""
     # Read progress file
     progress_file = os.path.join(job_dir, "progress.json")
     if os.path.exists(progress_file):
@@ -282,12 +311,11 @@ async def job_status(request: Request, job_id: str):
         progress_data = {"status": "unknown", "progress": 0.0}
     
     # Build response
-    base_url = str(request.base_url).rstrip("/")
     response = {
         "job_id": job_id,
         "status": progress_data.get("status", "unknown"),
         "progress": progress_data.get("progress", 0.0),
-        "timestamp": progress_data.get("timestamp", time.time())
+        "timestamp": progress_data.get("timestamp") or _mtime_or_now(progress_file)
     }
     
     if "error" in progress_data:
@@ -304,6 +332,10 @@ async def job_status(request: Request, job_id: str):
                 response["source"] = meta.get("separation_source") or meta.get("backend")
                 if meta.get("cloud_model"):
                     response["cloud_model"] = meta.get("cloud_model")
+                # Details clients would otherwise fetch from the meta file separately
+                for key in ("backend", "mode", "message"):
+                    if meta.get(key):
+                        response[key] = meta[key]
         except Exception:
             pass
 
@@ -355,6 +387,75 @@ async def job_status(request: Request, job_id: str):
 
     return response
 
+def _job_state(snapshot: dict) -> str:
+    """Compact status/progress token clients pass back as ?since= when long-polling."""
+    return f"{snapshot['status']}:{round(float(snapshot['progress']), 3)}"
+
+def _job_etag(snapshot: dict) -> str:
+    """ETag for a job snapshot: a hash of the whole payload, so new stems or meta fields also change it."""
+    body = json.dumps(snapshot, sort_keys=True, separators=(",", ":"), default=str)
+    return f'"{hashlib.sha1(body.encode("utf-8")).hexdigest()[:16]}"'
+
+@app.get("/job/{job_id}")
+async def job_status(request: Request, job_id: str, wait: float = 0.0, since: Optional[str] = None):
+    """
+    Get job status and results.
+    With ?wait=N&since=<state>, long-poll: hold the request for up to N seconds (max 60)
+    until the job's status/progress differs from `since` or it finishes.
+    Responses carry an ETag; a matching If-None-Match gets an empty 304.
+    """
+    job_dir = os.path.join(OUTPUTS_DIR, job_id)
+    
+    if not os.path.exists(job_dir):
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    base_url = str(request.base_url).rstrip("/")
+    snapshot = _job_snapshot(job_id, job_dir, base_url)
+    deadline = time.monotonic() + min(max(wait, 0.0), 60.0)
+    while (since is not None and _job_state(snapshot) == since
+           and snapshot["status"] not in ("done", "error") and time.monotonic() < deadline):
+        if await request.is_disconnected():
+            break
+        await asyncio.sleep(0.5)
+        snapshot = _job_snapshot(job_id, job_dir, base_url)
+    etag = _job_etag(snapshot)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return JSONResponse(content=snapshot, headers={"ETag": etag})
+
+@app.get("/job/{job_id}/events")
+async def job_events(request: Request, job_id: str):
+    """
+    Stream job status as Server-Sent Events: one frame per status/progress change, ending at done/error.
+    While nothing changes, a keep-alive comment goes out every few seconds so clients can check their deadlines.
+    """
+    job_dir = os.path.join(OUTPUTS_DIR, job_id)
+    
+    if not os.path.exists(job_dir):
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    base_url = str(request.base_url).rstrip("/")
+    
+    async def _events():
+        last = None
+        last_sent = time.monotonic()
+        while not await request.is_disconnected():
+            snapshot = _job_snapshot(job_id, job_dir, base_url)
+            # Same notion of "changed" as the long-poll ?since= token
+            state = _job_state(snapshot)
+            if state != last:
+                last = state
+                last_sent = time.monotonic()
+                yield f"data: {json.dumps(snapshot)}\n\n"
+            elif time.monotonic() - last_sent >= 5.0:
+                last_sent = time.monotonic()
+                yield ": keepalive\n\n"
+            if snapshot["status"] in ("done", "error"):
+                break
+            await asyncio.sleep(0.5)
+    
+    return StreamingResponse(_events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 @app.post("/transcribe")
 async def transcribe(request: Request, file: UploadFile = File(...), use_demucs: bool = Form(False), mode: str = Form("pure")):
     """
@@ -560,7 +661,8 @@ async def perform(request: Request, midi: UploadFile = File(...)):
 
     out_mid = os.path.join(job_dir, "performed.mid")
     try:
-        perform_midi(in_mid, out_mid)
+        # CPU-bound; run off the event loop so other requests keep being served
+        await asyncio.to_thread(perform_midi, in_mid, out_mid)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Performance enhancement failed: {e}")
 
@@ -898,28 +1000,98 @@ async def melody_to_midi_endpoint(request: Request, file: UploadFile = File(...)
     midi_url = f"{base_url}/outputs/{job_id}/melody.mid"
     return JSONResponse(content={"status": "done", "midi_url": midi_url, "job_id": job_id})
 
+# Prediction id -> Event set by /replicate_webhook so a polling job stops waiting as soon
+# as Replicate reports completion. The payload is only a wake-up hint: the job still
+# fetches the prediction status from the API itself.
+_replicate_wakeups: dict[str, threading.Event] = {}
+
+@app.post("/replicate_webhook")
+async def replicate_webhook(request: Request):
+    try:
+        payload = await request.json()
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid webhook payload")
+    wake = _replicate_wakeups.get(str(payload.get("id"))) if isinstance(payload, dict) else None
+    if wake is not None:
+        wake.set()
+    return {"status": "ok"}
+
+# Files stored by /upload, so several jobs can start from one upload.
+# Kept beside (not inside) OUTPUTS_DIR so they are neither served under /outputs nor seen as jobs.
+UPLOADS_DIR = os.path.join(os.path.dirname(OUTPUTS_DIR), "uploads")
+UPLOAD_TTL_SEC = 6 * 3600.0
+
+def _prune_uploads(now: Optional[float] = None) -> None:
+    """Delete stored uploads unused for UPLOAD_TTL_SEC (starting a job from one refreshes it)."""
+    cutoff = (now or time.time()) - UPLOAD_TTL_SEC
+    try:
+        entries = list(os.scandir(UPLOADS_DIR))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        try:
+            if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+        except OSError:
+            pass
+
+def _uploaded_input(file_id: str) -> str:
+    """Path of a file stored by /upload (404 if the id is unknown); marks the upload as recently used"""
+    upload_dir = os.path.join(UPLOADS_DIR, file_id)
+    if not file_id.isalnum() or not os.path.isdir(upload_dir):
+        raise HTTPException(status_code=404, detail="Unknown file_id")
+    for name in os.listdir(upload_dir):
+        if name.startswith("input"):
+            try:
+                os.utime(upload_dir)
+            except OSError:
+                pass
+            return os.path.join(upload_dir, name)
+    raise HTTPException(status_code=404, detail="Unknown file_id")
+
+@app.post("/upload")
+async def upload(file: UploadFile = File(...)):
+    """
+    Store an audio file once and return its file_id.
+    Pass file_id instead of a file to /separate_audio to start several jobs from one upload.
+    """
+    _prune_uploads()
+    file_id = uuid.uuid4().hex[:8]
+    upload_dir = os.path.join(UPLOADS_DIR, file_id)
+    os.makedirs(upload_dir, exist_ok=True)
+    input_path = os.path.join(upload_dir, f"input{os.path.splitext(file.filename or '')[1]}")
+    with open(input_path, "wb") as f:
+        shutil.copyfileobj(file.file, f)
+    return {"file_id": file_id}
+
 @app.post("/separate_audio")
-async def separate_audio(request: Request, file: UploadFile = File(...), mode: str = Form("mdx23"), cloud: Optional[bool] = Form(False), cloud_model: Optional[str] = Form(None)):
+async def separate_audio(request: Request, file: Optional[UploadFile] = File(None), file_id: Optional[str] = Form(None), mode: str = Form("mdx23"), cloud: Optional[bool] = Form(False), cloud_model: Optional[str] = Form(None)):
     """
     Start audio separation job. Returns job ID immediately.
     Use /job/{job_id} to check status and get results.
+    Takes either an uploaded file or the file_id of one stored by /upload.
     
     - mode="mdx23" (default): Good quality, faster Demucs model
     - mode="htdemucs"/"great": Highest quality (longer)
     - mode="spleeter": Alternative 2/4 stems
     - mode="fast": CPU-only quick preview
     """
-    if file is None:
+    if file is None and not file_id:
         raise HTTPException(status_code=400, detail="No file uploaded")
+    stored_input = _uploaded_input(file_id) if file is None else None
 
     job_id = uuid.uuid4().hex[:8]
     job_dir = os.path.join(OUTPUTS_DIR, job_id)
     os.makedirs(job_dir, exist_ok=True)
 
-    # Save uploaded file
-    input_path = os.path.join(job_dir, f"input{os.path.splitext(file.filename)[1]}")
-    with open(input_path, "wb") as f:
-        shutil.copyfileobj(file.file, f)
+    if file is not None:
+        # Save uploaded file
+        input_path = os.path.join(job_dir, f"input{os.path.splitext(file.filename)[1]}")
+        with open(input_path, "wb") as f:
+            shutil.copyfileobj(file.file, f)
+    else:
+        # Read straight from the stored upload; jobs only read their input
+        input_path = stored_input
 
     # FORCE CLOUD-ONLY: no local fallback. Require Replicate token.
     if _rep is None or not os.environ.get("REPLICATE_API_TOKEN"):
@@ -1095,8 +1267,7 @@ def _separate_audio_job_runner_cloud(job_id: str, job_dir: str, input_path: str,
         # Get the model and its latest version ID
         print(f"🔍 Getting model info for: {model_slug}")
         try:
-            model = client.models.get(model_slug)
-            version_id = model.latest_version.id
+            version_id = _replicate_latest_version(client, model_slug)
             print(f"✅ Model version ID: {version_id}")
         except Exception as e:
             raise RuntimeError(f"Failed to get model info: {e}")
@@ -1131,12 +1302,17 @@ def _separate_audio_job_runner_cloud(job_id: str, job_dir: str, input_path: str,
         print(f"🔍 Using model: {model_slug}")
         print(f"🔍 Input format: {candidate_inputs[0]}")
         
+        # With a public webhook URL configured, Replicate pings us on completion and the
+        # poll below wakes immediately; polling with backoff remains the fallback
+        webhook_url = os.environ.get("REPLICATE_WEBHOOK_URL")
+        create_kwargs = {"webhook": webhook_url, "webhook_events_filter": ["completed"]} if webhook_url else {}
+
         prediction = None
         last_err: Optional[Exception] = None
         for i, inp in enumerate(candidate_inputs):
             try:
                 print(f"🔍 Trying input {i+1}: {inp}")
-                prediction = client.predictions.create(version=version_id, input=inp)
+                prediction = client.predictions.create(version=version_id, input=inp, **create_kwargs)
                 print(f"✅ Prediction created successfully with input {i+1}")
                 last_err = None
                 break
@@ -1149,15 +1325,18 @@ def _separate_audio_job_runner_cloud(job_id: str, job_dir: str, input_path: str,
                 raise last_err
             raise RuntimeError("Failed to start cloud prediction")
 
-        # Poll until done (with timeout)
-        deadline = time.time() + 600  # 10 minutes max
-        while prediction.status not in ("succeeded", "failed", "canceled"):
-            if time.time() > deadline:
-                raise TimeoutError("Cloud separation timed out")
-            time.sleep(2)
-            prediction = client.predictions.get(prediction.id)
-            # Convert status to progress heuristically
-            _write_progress(job_dir, "processing", min(0.8, 0.15 + 0.6 * (time.time() % 30) / 30.0))
+        # Poll until done (10 minutes max), backing off between polls
+        wake = threading.Event()
+        _replicate_wakeups[prediction.id] = wake
+        try:
+            prediction = _poll_prediction(
+                client, prediction, 600, "Cloud separation timed out",
+                initial_delay=2.0, max_delay=30.0 if webhook_url else 8.0, wake=wake,
+                # Convert status to progress heuristically
+                on_poll=lambda _p: _write_progress(job_dir, "processing", min(0.8, 0.15 + 0.6 * (time.time() % 30) / 30.0)),
+            )
+        finally:
+            _replicate_wakeups.pop(prediction.id, None)
 
         if prediction.status != "succeeded":
             raise RuntimeError(f"Cloud separation failed: {prediction.status}")
@@ -1181,11 +1360,7 @@ def _separate_audio_job_runner_cloud(job_id: str, job_dir: str, input_path: str,
                     print(f"🔍 Downloading vocals from: {vocals_url}")
                     voc_path = os.path.join(job_dir, "vocals.wav")
                     
-                    import requests
-                    r = requests.get(vocals_url, timeout=120)
-                    r.raise_for_status()
-                    with open(voc_path, "wb") as f:
-                        f.write(r.content)
+                    _download_to_file(vocals_url, voc_path, timeout=120)
                     print(f"✅ Vocals downloaded: {voc_path}")
                 except Exception as e:
                     print(f"❌ Vocals download failed: {e}")
@@ -1201,10 +1376,7 @@ def _separate_audio_job_runner_cloud(job_id: str, job_dir: str, input_path: str,
                             print(f"🔍 Downloading {track_type} from: {track_url}")
                             
                             track_path = os.path.join(job_dir, f"{track_type}.wav")
-                            r = requests.get(track_url, timeout=120)
-                            r.raise_for_status()
-                            with open(track_path, "wb") as f:
-                                f.write(r.content)
+                            _download_to_file(track_url, track_path, timeout=120)
                             instrumental_tracks.append(track_path)
                             print(f"✅ {track_type} downloaded: {track_path}")
                     
@@ -1244,11 +1416,7 @@ def _separate_audio_job_runner_cloud(job_id: str, job_dir: str, input_path: str,
             for u in urls:
                 local = os.path.join(job_dir, os.path.basename(u.split("?")[0]))
                 try:
-                    import requests
-                    r = requests.get(u, timeout=120)
-                    r.raise_for_status()
-                    with open(local, "wb") as f:
-                        f.write(r.content)
+                    _download_to_file(u, local, timeout=120)
                     name_lower = os.path.basename(local).lower()
                     if "instrumental" in name_lower or "no_vocals" in name_lower or "karaoke" in name_lower:
                         inst_path = inst_path or local
@@ -1265,11 +1433,7 @@ def _separate_audio_job_runner_cloud(job_id: str, job_dir: str, input_path: str,
                     if u.endswith('.zip'):
                         local_zip = os.path.join(job_dir, os.path.basename(u))
                         if not os.path.exists(local_zip):
-                            import requests
-                            r = requests.get(u, timeout=120)
-                            r.raise_for_status()
-                            with open(local_zip, 'wb') as f:
-                                f.write(r.content)
+                            _download_to_file(u, local_zip, timeout=120)
                         with zipfile.ZipFile(local_zip, 'r') as z:
                             z.extractall(job_dir)
                         # search for extracted wavs
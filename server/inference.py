@@ -1,24 +1,70 @@
 import os
+import sys
 import math
+import functools
+import importlib
+import importlib.util
+import threading
+import types
 import uuid
 import tempfile
 import time
 from typing import Optional, Dict
 
 import numpy as np
-import librosa
 import soundfile as sf
 import pretty_midi
 import subprocess
 import shutil
-import bisect
 import httpx
 import json as _json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 try:
     import replicate as _rep  # optional, for cloud-enhanced transcription/performance
 except Exception:
     _rep = None
 
+
+_LAZY_IMPORT_LOCK = threading.Lock()
+
+
+class _LazyModule(types.ModuleType):
+    """Stand-in for a module that is imported on first attribute access.
+
+    importlib.util.LazyLoader is not thread-safe on first access before Python 3.12,
+    and job threads and thread-pool workers may touch these modules first. Here the
+    real import runs under a lock and only the finished module is handed out.
+    """
+
+    def __getattr__(self, attr: str):
+        module = self.__dict__.get("_lazy_module")
+        if module is None:
+            with _LAZY_IMPORT_LOCK:
+                module = self.__dict__.get("_lazy_module")
+                if module is None:
+                    module = importlib.import_module(self.__name__)
+                    self.__dict__["_lazy_module"] = module
+        return getattr(module, attr)
+
+
+def _lazy_import(name: str):
+    """Return a module that is only imported on first attribute access.
+
+    librosa (numba/scipy), requests and demucs (torch) dominate import time, and
+    many requests never touch them.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    # find_spec on a dotted name imports its parent packages, so only the top level is checked here
+    if importlib.util.find_spec(name.partition(".")[0]) is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    return _LazyModule(name)
+
+
+librosa = _lazy_import("librosa")
+requests = _lazy_import("requests")
+
 # Basic Pitch
 # Lazily import Basic Pitch inside the function to avoid hard TensorFlow/CoreML
 # dependency at server startup. This allows the API to boot even if the
@@ -26,9 +72,11 @@ except Exception:
 # version.
 
 # Optional: Demucs (stubbed for MVP to avoid heavy runtime deps)
+# HAS_DEMUCS only means demucs and torch are installed: neither is imported until the
+# first separation, so a broken install shows up there (each caller falls back on errors).
 try:
-    import demucs.separate
-    HAS_DEMUCS = True
+    demucs_separate = _lazy_import("demucs.separate")
+    HAS_DEMUCS = importlib.util.find_spec("torch") is not None
 except Exception:
     HAS_DEMUCS = False
 
@@ -41,6 +89,41 @@ def _safe_filename(name: str) -> str:
     return "".join(c for c in name if c.isalnum() or c in ("-", "_", "."))
 
 
+def _mkstemp_path(suffix: str) -> str:
+    """Create an empty named temp file and return its path, closing the fd mkstemp opens."""
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    return path
+
+
+@functools.lru_cache(maxsize=4)
+def _load_audio_by_key(path: str, mtime_ns: int, size: int, sr: Optional[int], mono: bool) -> tuple[np.ndarray, int]:
+    try:
+        # Decode directly with libsndfile (WAV/FLAC/OGG); skips librosa's backend probing
+        y, sr_out = sf.read(path, dtype="float32", always_2d=False)
+        if y.ndim > 1:
+            y = y.mean(axis=1) if mono else np.ascontiguousarray(y.T)
+        if sr is not None and sr != sr_out:
+            y = librosa.resample(y, orig_sr=sr_out, target_sr=sr, res_type="soxr_hq")
+            sr_out = sr
+    except RuntimeError:
+        # Formats libsndfile cannot read (e.g. MP3 on older builds) go through librosa/audioread
+        y, sr_out = librosa.load(path, sr=sr, mono=mono)
+    # Shared between callers via the cache – guard against in-place edits
+    y.setflags(write=False)
+    return y, sr_out
+
+
+def _load_audio(path: str, sr: Optional[int] = 22050, mono: bool = True) -> tuple[np.ndarray, int]:
+    """
+    librosa.load with a small in-process cache keyed on (path, mtime, size, sr, mono),
+    so a file decoded for BPM estimation is not decoded again by later stages of the
+    same job. The returned array is read-only; copy it before modifying.
+    """
+    st = os.stat(path)
+    return _load_audio_by_key(os.path.abspath(path), st.st_mtime_ns, st.st_size, sr, mono)
+
+
 def _estimate_bpm(audio: np.ndarray, sr: int) -> Optional[float]:
     try:
         tempo = librosa.beat.tempo(y=audio, sr=sr)
@@ -59,6 +142,16 @@ def _quantize_time(value_sec: float, grid_sec: float) -> float:
     return round(value_sec / grid_sec) * grid_sec
 
 
+def _note_fields(notes: list[pretty_midi.Note]) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Structure-of-arrays copy of notes: (starts, ends, pitches, velocities)."""
+    count = len(notes)
+    starts = np.fromiter((n.start for n in notes), dtype=float, count=count)
+    ends = np.fromiter((n.end for n in notes), dtype=float, count=count)
+    pitches = np.fromiter((n.pitch for n in notes), dtype=int, count=count)
+    velocities = np.fromiter((n.velocity for n in notes), dtype=int, count=count)
+    return starts, ends, pitches, velocities
+
+
 def _post_process_midi(
     midi: pretty_midi.PrettyMIDI,
     bpm: Optional[float],
@@ -109,15 +202,21 @@ def _post_process_midi(
                     n.velocity = int(max(1, min(127, round(v))))
 
         # Optional humanization: add tiny randomness to timing/velocity after quantization
+        # (all random draws for the instrument are made in one call each)
         if (humanize_timing_sec > 0 or humanize_velocity_range > 0) and instrument.notes:
-            for n in instrument.notes:
-                if humanize_timing_sec > 0:
-                    jitter = float(np.random.uniform(-humanize_timing_sec, humanize_timing_sec))
-                    n.start = max(0.0, n.start + jitter)
-                    n.end = max(n.start + 0.01, n.end + jitter)
-                if humanize_velocity_range > 0:
-                    dv = int(np.random.randint(-humanize_velocity_range, humanize_velocity_range + 1))
-                    n.velocity = int(max(1, min(127, n.velocity + dv)))
+            count = len(instrument.notes)
+            starts, ends, _, vels = _note_fields(instrument.notes)
+            if humanize_timing_sec > 0:
+                jitter = np.random.uniform(-humanize_timing_sec, humanize_timing_sec, size=count)
+                starts = np.maximum(0.0, starts + jitter)
+                ends = np.maximum(starts + 0.01, ends + jitter)
+            if humanize_velocity_range > 0:
+                dv = np.random.randint(-humanize_velocity_range, humanize_velocity_range + 1, size=count)
+                vels = np.clip(vels + dv, 1, 127)
+            for n, a, b, v in zip(instrument.notes, starts.tolist(), ends.tolist(), vels.tolist()):
+                n.start = a
+                n.end = b
+                n.velocity = v
 
         # Optional sustain pedal injection (simple heuristic):
         # Turn pedal on at the start of dense passages and release on gaps.
@@ -190,16 +289,29 @@ def _limit_pitch_and_length(midi: pretty_midi.PrettyMIDI,
                             min_duration_sec: float = 0.06) -> pretty_midi.PrettyMIDI:
     """Constrain to piano-friendly range and drop very short artifacts."""
     for inst in midi.instruments:
-        kept: list[pretty_midi.Note] = []
-        for n in inst.notes:
-            if n.end - n.start < min_duration_sec:
-                continue
-            n.pitch = int(max(pitch_min, min(pitch_max, n.pitch)))
-            kept.append(n)
-        inst.notes = kept
+        starts, ends, pitches, _ = _note_fields(inst.notes)
+        keep = np.flatnonzero((ends - starts) >= min_duration_sec).tolist()
+        clamped = np.clip(pitches, pitch_min, pitch_max).tolist()
+        notes = inst.notes
+        for i in keep:
+            notes[i].pitch = clamped[i]
+        inst.notes = [notes[i] for i in keep]
     return midi
 
 
+def _voice_pitch_class(pitch: int, center: int) -> int:
+    """
+    Octave-shift pitch into [center - 7, center + 9]: lift to the lowest octave at or
+    above center - 7, then drop by whole octaves if it still exceeds center + 9.
+    """
+    low, high = center - 7, center + 9
+    if pitch < low:
+        pitch += 12 * -((pitch - low) // 12)
+    if pitch > high:
+        pitch -= 12 * -((high - pitch) // 12)
+    return pitch
+
+
 def _refine_midi_against_audio(pm: pretty_midi.PrettyMIDI, audio_path: str, bpm: Optional[float] = None,
                                max_poly: int = 3) -> pretty_midi.PrettyMIDI:
     """
@@ -212,8 +324,8 @@ def _refine_midi_against_audio(pm: pretty_midi.PrettyMIDI, audio_path: str, bpm:
     except Exception:
         return pm
 
-    # Load audio and compute chroma energy over time
-    y, sr = _lb.load(audio_path, sr=22050, mono=True)
+    # Load audio (cached decode) and compute chroma energy over time
+    y, sr = _load_audio(audio_path, sr=22050, mono=True)
     hop_length = 512
     try:
         chroma = _lb.feature.chroma_cqt(y=y, sr=sr)
@@ -225,24 +337,25 @@ def _refine_midi_against_audio(pm: pretty_midi.PrettyMIDI, audio_path: str, bpm:
     chroma = _np.clip(chroma, 0.0, None)
     cmax = float(chroma.max()) or 1.0
 
-    # Map time to frame index
-    def t_to_idx(t: float) -> int:
-        if t <= 0: return 0
-        return int(min(len(times) - 1, max(0, _np.searchsorted(times, t))))
+    # Map times to frame indices (one searchsorted over the whole query array)
+    def t_to_idx(t: _np.ndarray) -> _np.ndarray:
+        return _np.clip(_np.searchsorted(times, t), 0, len(times) - 1)
+
+    # Mean chroma over any frame span from per-row prefix sums
+    chroma_cs = _np.zeros((12, chroma.shape[1] + 1))
+    _np.cumsum(chroma, axis=1, out=chroma_cs[:, 1:])
 
     # Drop notes with consistently weak chroma support
     new_instrs: list[pretty_midi.Instrument] = []
     for inst in pm.instruments:
-        kept: list[pretty_midi.Note] = []
-        for n in inst.notes:
-            i0 = t_to_idx(n.start)
-            i1 = max(i0 + 1, t_to_idx(n.end))
-            pc = int(n.pitch % 12)
-            support = float(chroma[pc, i0:i1].mean()) / cmax
-            if support >= 0.12:  # keep if has minimal chroma support
-                kept.append(n)
+        starts, ends, pitches, _ = _note_fields(inst.notes)
+        i0 = t_to_idx(starts)
+        i1 = _np.maximum(i0 + 1, t_to_idx(ends))
+        pc = pitches % 12
+        support = (chroma_cs[pc, i1] - chroma_cs[pc, i0]) / (i1 - i0) / cmax
+        keep = support >= 0.12  # keep if has minimal chroma support
         new = pretty_midi.Instrument(program=inst.program, is_drum=inst.is_drum, name=inst.name)
-        new.notes = kept
+        new.notes = [inst.notes[i] for i in _np.flatnonzero(keep).tolist()]
         new_instrs.append(new)
     pm.instruments = new_instrs
 
@@ -255,19 +368,23 @@ def _refine_midi_against_audio(pm: pretty_midi.PrettyMIDI, audio_path: str, bpm:
 
     # Precompute active PCs from current MIDI at grid steps
     end_time = pm.get_end_time()
+    blocks: list[tuple[float, float]] = []
     t = 0.0
-    target_center = 60
-    additions: list[pretty_midi.Note] = []
     while t < end_time:
         t2 = min(end_time, t + grid)
-        # Active PCs in MIDI at this block
-        active_pcs: set[int] = set()
-        for inst in pm.instruments:
-            for n in inst.notes:
-                if n.start < t2 and n.end > t:
-                    active_pcs.add(n.pitch % 12)
+        blocks.append((t, t2))
+        t = t2
+    # Chroma frame at every block center
+    centers = t_to_idx(_np.array([t + 0.5 * (t2 - t) for t, t2 in blocks])).tolist()
+    # Active PCs in MIDI for every block at once (12-bit masks), all instruments together
+    t_arr = _np.array([b[0] for b in blocks], dtype=float)
+    t2_arr = _np.array([b[1] for b in blocks], dtype=float)
+    active_masks = _grid_pc_masks(_pm_to_soa(pm), t_arr, t2_arr).tolist()
+    target_center = 60
+    additions: list[pretty_midi.Note] = []
+    for (t, t2), ci, active in zip(blocks, centers, active_masks):
+        active_pcs = {pc for pc in range(12) if (active >> pc) & 1}
         # Chroma peaks at this block center
-        ci = t_to_idx(t + 0.5 * (t2 - t))
         col = chroma[:, ci]
         thresh = 0.5 * float(col.max())
         candidate_pcs = [int(i) for i, v in enumerate(col) if v >= thresh and v / cmax >= 0.15]
@@ -280,13 +397,8 @@ def _refine_midi_against_audio(pm: pretty_midi.PrettyMIDI, audio_path: str, bpm:
                 to_add.append(pc)
         # Create short notes for missing PCs
         for pc in to_add:
-            pitch = pc
-            while pitch < target_center - 7:
-                pitch += 12
-            while pitch > target_center + 9:
-                pitch -= 12
+            pitch = _voice_pitch_class(pc, target_center)
             additions.append(pretty_midi.Note(velocity=82, pitch=int(pitch), start=float(t), end=float(t2)))
-        t = t2
 
     if additions:
         # Put all notes in first instrument to keep a single-track piano
@@ -302,40 +414,43 @@ def _refine_midi_against_audio(pm: pretty_midi.PrettyMIDI, audio_path: str, bpm:
 
 
 def _merge_midis_union(
-    a: pretty_midi.PrettyMIDI,
-    b: pretty_midi.PrettyMIDI,
-    onset_window_sec: float = 0.03,
+    midis: list[pretty_midi.PrettyMIDI],
     dedup_window_sec: float = 0.02,
 ) -> pretty_midi.PrettyMIDI:
-    """Union merge of two MIDIs with near-duplicate removal.
-    Keeps a single piano track with notes from both.
+    """Union merge of any number of MIDIs with near-duplicate removal.
+    Keeps a single piano track with notes from all of them. Same-pitch notes whose
+    onsets chain within dedup_window_sec collapse to the longest (then loudest) one.
     """
     out = pretty_midi.PrettyMIDI()
     inst = pretty_midi.Instrument(program=0)
+    out.instruments.append(inst)
 
-    def _collect(m: pretty_midi.PrettyMIDI) -> list[pretty_midi.Note]:
-        notes: list[pretty_midi.Note] = []
-        for tr in m.instruments:
-            for n in tr.notes:
-                notes.append(pretty_midi.Note(velocity=n.velocity, pitch=n.pitch, start=n.start, end=n.end))
-        return notes
+    notes = [n for m in midis for tr in m.instruments for n in tr.notes]
+    if not notes:
+        return out
+    starts, ends, pitches, vels = _note_fields(notes)
+
+    # Group near-identical notes in one pass: order by pitch then start, and start a
+    # new cluster wherever the pitch changes or the onset gap exceeds the window
+    order = np.lexsort((-vels, starts, pitches))
+    s_o, p_o = starts[order], pitches[order]
+    new_cluster = np.ones(order.size, dtype=bool)
+    new_cluster[1:] = (p_o[1:] != p_o[:-1]) | (np.diff(s_o) > dedup_window_sec)
+    cluster = np.cumsum(new_cluster)
+
+    # Keep the one with longer duration / higher velocity: the last of each cluster
+    # when ranked by (cluster, duration, velocity)
+    rank = np.lexsort((vels[order], (ends - starts)[order], cluster))
+    cl_ranked = cluster[rank]
+    last = np.append(cl_ranked[1:] != cl_ranked[:-1], True)
+    keep = order[rank[last]]
 
-    notes = _collect(a) + _collect(b)
     # Sort by start time then pitch
-    notes.sort(key=lambda n: (n.start, n.pitch, -n.velocity))
-
-    # Deduplicate near-identical notes (same pitch within small window)
-    merged: list[pretty_midi.Note] = []
-    for n in notes:
-        if merged and n.pitch == merged[-1].pitch and abs(n.start - merged[-1].start) <= dedup_window_sec:
-            # keep the one with longer duration / higher velocity
-            if (n.end - n.start) > (merged[-1].end - merged[-1].start) or n.velocity > merged[-1].velocity:
-                merged[-1] = n
-        else:
-            merged.append(n)
-
-    inst.notes = merged
-    out.instruments.append(inst)
+    keep = keep[np.lexsort((-vels[keep], pitches[keep], starts[keep]))]
+    inst.notes = [
+        pretty_midi.Note(velocity=v, pitch=p, start=a, end=b)
+        for v, p, a, b in zip(vels[keep].tolist(), pitches[keep].tolist(), starts[keep].tolist(), ends[keep].tolist())
+    ]
     return out
 
 def _convert_to_wav(input_path: str, target_sr: int = 22050) -> str:
@@ -346,8 +461,7 @@ def _convert_to_wav(input_path: str, target_sr: int = 22050) -> str:
     2) macOS afconvert (if available)
     3) Python fallback via librosa+soundfile (may fail on Python 3.13 when deps import removed stdlib modules)
     """
-    fd, tmp_wav_path = tempfile.mkstemp(suffix=".wav")
-    os.close(fd)
+    tmp_wav_path = _mkstemp_path(".wav")
 
     # 1) Try ffmpeg
     ffmpeg = shutil.which("ffmpeg")
@@ -411,7 +525,7 @@ def _maybe_run_demucs(input_wav_path: str) -> str:
         elif HAS_DEMUCS:
             # Fallback to Python entry if CLI is not found
             # Equivalent to: demucs -n htdemucs -o tmp_out input_wav_path
-            demucs.separate.main(["-n", "htdemucs", "-o", tmp_out, input_wav_path])
+            demucs_separate.main(["-n", "htdemucs", "-o", tmp_out, input_wav_path])
         else:
             return input_wav_path
 
@@ -455,7 +569,7 @@ def separate_audio(input_wav_path: str) -> tuple[str, str | None]:
             cmd = [demucs_bin, "-n", "htdemucs", "--overlap", "0.9", "--shifts", "1", "-o", tmp_out, input_wav_path]
             subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
         elif HAS_DEMUCS:
-            demucs.separate.main(["-n", "htdemucs", "--overlap", "0.75", "--shifts", "1", "-o", tmp_out, input_wav_path])
+            demucs_separate.main(["-n", "htdemucs", "--overlap", "0.75", "--shifts", "1", "-o", tmp_out, input_wav_path])
         else:
             return input_wav_path, None
 
@@ -492,7 +606,7 @@ def separate_audio_mdx23(input_wav_path: str) -> tuple[str, str | None]:
             cmd = [demucs_bin, "-n", "mdx23", "-o", tmp_out, input_wav_path]
             subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
         elif HAS_DEMUCS:
-            demucs.separate.main(["-n", "mdx23", "-o", tmp_out, input_wav_path])
+            demucs_separate.main(["-n", "mdx23", "-o", tmp_out, input_wav_path])
         else:
             return input_wav_path, None
 
@@ -531,7 +645,7 @@ def separate_audio_medium(input_wav_path: str) -> tuple[str, str | None]:
             cmd = [demucs_bin, "-n", model, "-o", tmp_out, input_wav_path]
             subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
         elif HAS_DEMUCS:
-            demucs.separate.main(["-n", "mdx_extra_q", "-o", tmp_out, input_wav_path])
+            demucs_separate.main(["-n", "mdx_extra_q", "-o", tmp_out, input_wav_path])
         else:
             return input_wav_path, None
 
@@ -575,8 +689,8 @@ def separate_audio_fast(input_wav_path: str) -> tuple[str, str]:
             vocals = harm
             inst = y - harm
             # Write to temp files
-            inst_path = tempfile.mkstemp(suffix="_inst_fast.wav")[1]
-            voc_path = tempfile.mkstemp(suffix="_voc_fast.wav")[1]
+            inst_path = _mkstemp_path("_inst_fast.wav")
+            voc_path = _mkstemp_path("_voc_fast.wav")
             _sf.write(inst_path, inst, sr)
             _sf.write(voc_path, vocals, sr)
             return inst_path, voc_path
@@ -590,8 +704,8 @@ def separate_audio_fast(input_wav_path: str) -> tuple[str, str]:
             mid = (L + R) / 2
             side = (L - R) / 2
             # Write to temp files
-            inst_path = tempfile.mkstemp(suffix="_inst_fast.wav")[1]
-            voc_path = tempfile.mkstemp(suffix="_voc_fast.wav")[1]
+            inst_path = _mkstemp_path("_inst_fast.wav")
+            voc_path = _mkstemp_path("_voc_fast.wav")
             _sf.write(inst_path, side, sr)
             _sf.write(voc_path, mid, sr)
             return inst_path, voc_path
@@ -711,6 +825,35 @@ def separate_audio_umx(input_wav_path: str) -> tuple[str, str | None]:
         return input_wav_path, None
 
 
+def _peak_normalize(x: np.ndarray) -> np.ndarray:
+    """
+    Scale x down to a peak of 1.0 if it would clip. max(|x|) is taken as
+    max(-min, max) to avoid allocating an |x| temporary; scaling happens in place
+    when x is writeable (read-only views get a scaled copy).
+    """
+    if x.size == 0:
+        return x
+    m = float(max(-x.min(), x.max()))
+    if m <= 1.0:
+        return x
+    if x.flags.writeable:
+        np.multiply(x, 1.0 / m, out=x)
+        return x
+    return x * (1.0 / m)
+
+
+def _write_wav_pcm16(path: str, x: np.ndarray, sr: int) -> None:
+    """
+    Write a float signal in [-1, 1] shaped (channels, samples) or (samples,) as a
+    16-bit PCM WAV. Converts to float32 and interleaves into one contiguous buffer
+    up front so soundfile does not transpose/convert on the fly.
+    """
+    x = np.asarray(x, dtype=np.float32)
+    if x.ndim == 2:
+        x = x.T
+    sf.write(path, np.ascontiguousarray(x), sr, subtype="PCM_16")
+
+
 def separate_audio_local_ml(input_wav_path: str) -> tuple[str, str]:
     """
     Lightweight local "ML-like" separation using a hybrid of:
@@ -721,7 +864,6 @@ def separate_audio_local_ml(input_wav_path: str) -> tuple[str, str]:
     """
     import librosa as _lb
     import numpy as _np
-    import soundfile as _sf
     y, sr = _lb.load(input_wav_path, sr=None, mono=False)
     if y.ndim == 1:
         y = _np.expand_dims(y, axis=0)
@@ -735,7 +877,7 @@ def separate_audio_local_ml(input_wav_path: str) -> tuple[str, str]:
         voiced = _np.nan_to_num(voiced_flag.astype(float), nan=0.0)
     except Exception:
         # If pyin fails, fall back to simple energy-based voicing
-        S = _np.abs(_lb.stft(y_mono, n_fft=2048, hop_length=512))
+        S = _np.abs(_lb.stft(y_mono, n_fft=2048, hop_length=512, window=_hann_window(2048)))
         energy = S.mean(axis=0)
         thr = float(_np.percentile(energy, 60))
         voiced = (energy >= thr).astype(float)
@@ -762,28 +904,50 @@ def separate_audio_local_ml(input_wav_path: str) -> tuple[str, str]:
         vocals = vocals_mono
         inst = y_mono - vocals_mono
     else:
-        vocals = _np.vstack([vocals_mono, vocals_mono])
-        inst = y - vocals
+        # Broadcast the mono estimate across channels instead of duplicating it;
+        # the read-only view is only materialized when written out
+        vocals = _np.broadcast_to(vocals_mono[None, :], y.shape)
+        inst = y - vocals_mono[None, :]
     # Normalize
-    def _norm(x: _np.ndarray) -> _np.ndarray:
-        m = _np.max(_np.abs(x))
-        return x / m if m > 1.0 else x
-    inst = _norm(inst)
-    vocals = _norm(vocals)
-    inst_path = tempfile.mkstemp(suffix="_inst_localml.wav")[1]
-    voc_path = tempfile.mkstemp(suffix="_voc_localml.wav")[1]
+    inst = _peak_normalize(inst)
+    vocals = _peak_normalize(vocals)
+    inst_path = _mkstemp_path("_inst_localml.wav")
+    voc_path = _mkstemp_path("_voc_localml.wav")
     # Write
-    if inst.ndim == 1:
-        _sf.write(inst_path, inst, sr)
-    else:
-        _sf.write(inst_path, inst.T, sr)
-    if vocals.ndim == 1:
-        _sf.write(voc_path, vocals, sr)
-    else:
-        _sf.write(voc_path, vocals.T, sr)
+    _write_wav_pcm16(inst_path, inst, sr)
+    _write_wav_pcm16(voc_path, vocals, sr)
     return inst_path, voc_path
 
 
+@functools.lru_cache(maxsize=8)
+def _hann_window(n_fft: int) -> np.ndarray:
+    """Periodic Hann window (same as scipy hann(sym=False) / librosa 'hann'), built once per size."""
+    w = (0.5 - 0.5 * np.cos(2.0 * np.pi * np.arange(n_fft) / n_fft)).astype(np.float32)
+    w.setflags(write=False)
+    return w
+
+
+_STFT_PLANS: dict = {}
+
+
+def _stft_plan(n_fft: int, hop: int, sr: int):
+    """
+    Return a cached scipy ShortTimeFFT plan for (n_fft, hop, sr), or None if the
+    installed scipy predates ShortTimeFFT (callers then fall back to librosa).
+    """
+    key = (n_fft, hop, sr)
+    plan = _STFT_PLANS.get(key)
+    if plan is None:
+        try:
+            from scipy.signal import ShortTimeFFT  # type: ignore
+        except Exception:
+            return None
+        # float32 window keeps the transforms in complex64
+        plan = ShortTimeFFT(_hann_window(n_fft), hop=hop, fs=sr, fft_mode="onesided")
+        _STFT_PLANS[key] = plan
+    return plan
+
+
 def _enhance_stems(inst_path: str, voc_path: str, strength: float = 0.7) -> tuple[str, str]:
     """
     Light AI-like enhancement step to reduce cross-talk and artifacts using
@@ -792,13 +956,22 @@ def _enhance_stems(inst_path: str, voc_path: str, strength: float = 0.7) -> tupl
     - Compute magnitude STFTs of both stems
     - Build soft ratio masks (Wiener-like) with exponent p=2 and blend factor
     - Apply masks to each stem to suppress leakage
+
+    Returns the input paths unchanged when strength <= 0 or either stem is
+    near-silent (there is no leakage to remove).
     """
     import librosa as _lb
     import numpy as _np
-    import soundfile as _sf
+    if strength <= 0:
+        return inst_path, voc_path
     # Load
     y_i, sr_i = _lb.load(inst_path, sr=None, mono=False)
     y_v, sr_v = _lb.load(voc_path, sr=None, mono=False)
+    silence = 1e-3
+    if y_i.size == 0 or y_v.size == 0:
+        return inst_path, voc_path
+    if max(-y_i.min(), y_i.max()) < silence or max(-y_v.min(), y_v.max()) < silence:
+        return inst_path, voc_path
     sr = sr_i if sr_i else sr_v
     if y_i.ndim == 1:
         y_i = _np.expand_dims(y_i, 0)
@@ -807,13 +980,19 @@ def _enhance_stems(inst_path: str, voc_path: str, strength: float = 0.7) -> tupl
     # Use same hop/n_fft
     n_fft = 2048
     hop = 512
+    plan = _stft_plan(n_fft, hop, int(sr))
     def stft_mag(x):
-        S = _lb.stft(x, n_fft=n_fft, hop_length=hop)
+        if plan is not None:
+            S = plan.stft(x)
+        else:
+            S = _lb.stft(x, n_fft=n_fft, hop_length=hop, window=_hann_window(n_fft))
         return S, _np.abs(S)
-    # Per-channel processing
-    yi_new = []
-    yv_new = []
-    for ch in range(min(y_i.shape[0], y_v.shape[0])):
+    def istft(S, length: int):
+        if plan is not None:
+            return plan.istft(S, k1=length)
+        return _lb.istft(S, hop_length=hop, window=_hann_window(n_fft), length=length)
+    # Per-channel processing (channels are independent; FFTs release the GIL)
+    def _proc(ch: int):
         Si, Mi = stft_mag(y_i[ch])
         Sv, Mv = stft_mag(y_v[ch])
         # Soft mask
@@ -828,23 +1007,27 @@ def _enhance_stems(inst_path: str, voc_path: str, strength: float = 0.7) -> tupl
         Si_new = M_inst * Si
         Sv_new = M_voc * Sv
         # ISTFT
-        yi_ch = _lb.istft(Si_new, hop_length=hop, length=y_i.shape[1])
-        yv_ch = _lb.istft(Sv_new, hop_length=hop, length=y_v.shape[1])
-        yi_new.append(yi_ch)
-        yv_new.append(yv_ch)
-    yi_new = _np.vstack(yi_new)
-    yv_new = _np.vstack(yv_new)
+        yi_ch = istft(Si_new, y_i.shape[1])
+        yv_ch = istft(Sv_new, y_v.shape[1])
+        return yi_ch, yv_ch
+    n_ch = min(y_i.shape[0], y_v.shape[0])
+    with ThreadPoolExecutor(max_workers=max(1, min(2, n_ch))) as pool:
+        results = list(pool.map(_proc, range(n_ch)))
+    yi_new = _np.vstack([r[0] for r in results])
+    yv_new = _np.vstack([r[1] for r in results])
     # Normalize to prevent clipping
-    def _norm(x):
-        m = float(_np.max(_np.abs(x)) or 1.0)
-        return (x / m) if m > 1.0 else x
-    yi_new = _norm(yi_new)
-    yv_new = _norm(yv_new)
+    yi_new = _peak_normalize(yi_new)
+    yv_new = _peak_normalize(yv_new)
     # Write to temp
-    inst_enh = tempfile.mkstemp(suffix="_inst_enh.wav")[1]
-    voc_enh = tempfile.mkstemp(suffix="_voc_enh.wav")[1]
-    _sf.write(inst_enh, yi_new.T if yi_new.ndim == 2 else yi_new, sr)
-    _sf.write(voc_enh, yv_new.T if yv_new.ndim == 2 else yv_new, sr)
+    inst_enh = _mkstemp_path("_inst_enh.wav")
+    voc_enh = _mkstemp_path("_voc_enh.wav")
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futs = [
+            pool.submit(_write_wav_pcm16, inst_enh, yi_new, sr),
+            pool.submit(_write_wav_pcm16, voc_enh, yv_new, sr),
+        ]
+        for f in futs:
+            f.result()
     return inst_enh, voc_enh
 
 
@@ -879,7 +1062,7 @@ def separate_audio_great(input_wav_path: str, enhance: bool = True) -> tuple[str
         elif HAS_DEMUCS:
             # Python entry – no direct two-stems flag reliably; fall back to standard HQ
             # Note: Python demucs doesn't have built-in timeout, but the job runner will handle it
-            demucs.separate.main(["-n", "htdemucs", "-o", tmp_out, input_wav_path])
+            demucs_separate.main(["-n", "htdemucs", "-o", tmp_out, input_wav_path])
         else:
             return input_wav_path, None
 
@@ -912,6 +1095,30 @@ def separate_audio_great(input_wav_path: str, enhance: bool = True) -> tuple[str
     except Exception:
         return input_wav_path, None
 
+def separate_audio_all_modes(input_path: str) -> tuple[tuple[str, str | None], tuple[str, str | None], tuple[str, str]]:
+    """
+    Run the standard, pro and speed separations on one input, converting it to WAV only once.
+    The converted WAV is shared by all three (standard = separate_audio, pro = separate_audio_great,
+    speed = separate_audio_fast) and removed afterwards unless a result points at it.
+    Returns ((inst, voc) standard, (inst, voc) pro, (inst, voc) speed).
+    """
+    wav_path = _convert_to_wav(input_path) if not input_path.lower().endswith('.wav') else input_path
+    results = ()
+    try:
+        results = (
+            separate_audio(wav_path),
+            separate_audio_great(wav_path, enhance=True),
+            separate_audio_fast(wav_path),
+        )
+        return results
+    finally:
+        # The Demucs separators hand back their input path when they fail; keep it in that case
+        if wav_path != input_path and all(wav_path not in pair for pair in results):
+            try:
+                os.remove(wav_path)
+            except OSError:
+                pass
+
 def separate_audio_spleeter_api(local_audio_path: str) -> Dict[str, Optional[str]]:
     """
     Call a hosted Spleeter-compatible API to separate the input audio.
@@ -951,23 +1158,19 @@ def separate_audio_spleeter_api(local_audio_path: str) -> Dict[str, Optional[str
     file_field = os.environ.get("SPLEETER_API_FILE_FIELD", "audio")
     stems_value = os.environ.get("SPLEETER_API_STEMS", "2")
 
-    # Build multipart payload
-    files = {
-        file_field: (
-            os.path.basename(local_audio_path) or "input",
-            open(local_audio_path, "rb"),
-            "application/octet-stream",
-        )
-    }
     data = {"stems": stems_value, **extra_fields}
 
-    # Local import to avoid hard dependency unless configured
-    try:
-        import requests as _rq  # type: ignore
-    except Exception as e:
-        raise RuntimeError("'requests' package is required. Install with: pip install requests")
-
-    resp = _rq.post(url, headers=headers, files=files, data=data, timeout=1200)
+    # httpx streams file objects in the multipart body chunk by chunk instead of
+    # buffering the whole file; keep the handle open only for the request.
+    with open(local_audio_path, "rb") as fh:
+        files = {
+            file_field: (
+                os.path.basename(local_audio_path) or "input",
+                fh,
+                "application/octet-stream",
+            )
+        }
+        resp = httpx.post(url, headers=headers, files=files, data=data, timeout=1200)
     if resp.status_code >= 400:
         raise RuntimeError(f"Spleeter API returned {resp.status_code}: {resp.text[:500]}")
 
@@ -978,36 +1181,43 @@ def separate_audio_spleeter_api(local_audio_path: str) -> Dict[str, Optional[str
         # Some providers may directly return a file/bytes – not supported here
         raise RuntimeError("Spleeter API did not return JSON; please provide a JSON API or adapter")
 
-    def _find_url(obj: object, preferred_keys: list[str]) -> Optional[str]:
-        # DFS to locate a URL under preferred key names
-        stack = [obj]
+    def _find_urls(obj: object, key_groups: list[list[str]]) -> list[Optional[str]]:
+        # Single iterative DFS over the payload. For each key group, pick the URL under
+        # the highest-priority key found at any depth; groups with no keyed match fall
+        # back to the first URL seen anywhere.
+        ranks = [{k: r for r, k in enumerate(keys)} for keys in key_groups]
+        best: list[Optional[tuple[int, str]]] = [None] * len(key_groups)
+        first_any: Optional[str] = None
+        stack: deque = deque([obj])
         while stack:
             cur = stack.pop()
             if isinstance(cur, dict):
-                # exact key preference
-                for k in preferred_keys:
-                    if k in cur and isinstance(cur[k], str) and cur[k].startswith("http"):
-                        return cur[k]
-                # any string URL
-                for v in cur.values():
-                    if isinstance(v, str) and v.startswith("http"):
-                        return v
-                # scan deeper
-                for v in cur.values():
-                    if isinstance(v, (dict, list)):
-                        stack.append(v)
+                items = cur.items()
             elif isinstance(cur, list):
-                for v in cur:
-                    if isinstance(v, (dict, list)):
-                        stack.append(v)
-                    elif isinstance(v, str) and v.startswith("http"):
-                        return v
-        return None
-
-    instrumental_url = _find_url(payload, [
-        "instrumental", "accompaniment", "no_vocals", "other", "background",
+                items = ((None, v) for v in cur)
+            else:
+                continue
+            for k, v in items:
+                if isinstance(v, str):
+                    if not v.startswith("http"):
+                        continue
+                    if first_any is None:
+                        first_any = v
+                    for gi, rank_of in enumerate(ranks):
+                        r = rank_of.get(k)
+                        if r is not None and (best[gi] is None or r < best[gi][0]):
+                            best[gi] = (r, v)
+                    # Every group already has its top-priority key → done
+                    if all(bst is not None and bst[0] == 0 for bst in best):
+                        return [bst[1] for bst in best]
+                elif isinstance(v, (dict, list)):
+                    stack.append(v)
+        return [bst[1] if bst is not None else first_any for bst in best]
+
+    instrumental_url, vocals_url = _find_urls(payload, [
+        ["instrumental", "accompaniment", "no_vocals", "other", "background"],
+        ["vocals", "voice", "vocal"],
     ])
-    vocals_url = _find_url(payload, ["vocals", "voice", "vocal"])
 
     return {
         "instrumental_url": instrumental_url,
@@ -1055,98 +1265,67 @@ def transcribe_to_midi(
     Returns dict: { "notes": int, "duration_sec": float, "bpm_estimate": float | None }
     """
     # Load audio for BPM estimation and potential conversion
-    audio, sr = librosa.load(input_wav_path, sr=22050, mono=True)
+    audio, sr = _load_audio(input_wav_path, sr=22050, mono=True)
     bpm_estimate = bpm_hint if bpm_hint is not None else _estimate_bpm(audio, sr)
 
     # Optional separation (stubbed)
     separated_wav = _maybe_run_demucs(input_wav_path) if use_demucs else input_wav_path
 
-    # Use Basic Pitch to produce an initial MIDI to a temp directory
-    with tempfile.TemporaryDirectory() as tmpdir:
-        # Lazy import to avoid hard dependency at server startup
-        try:
-            from basic_pitch.inference import predict_and_save, ICASSP_2022_MODEL_PATH  # type: ignore
-        except Exception:
-            # If Basic Pitch import fails, raise error (PTI removed)
-            raise RuntimeError(
-                "Basic Pitch is not installed. Install with: \n"
-                "  pip install basic-pitch\n"
-                "PTI fallback has been removed as it was not producing good results."
-            )
-        # Call Basic Pitch with a version-tolerant wrapper (supports 0.3.x and >=0.4.x)
-        try:
-            predict_and_save(
-                [separated_wav], tmpdir, True, False, False, False, ICASSP_2022_MODEL_PATH,
-            )
-        except TypeError:
-            predict_and_save(
-                [separated_wav], True, False, False, False, ICASSP_2022_MODEL_PATH, tmpdir,
-            )
-
-        # Find the produced MIDI file
-        midi_candidates = [
-            os.path.join(tmpdir, f) for f in os.listdir(tmpdir) if f.lower().endswith(".mid") or f.lower().endswith(".midi")
-        ]
-        if not midi_candidates:
-            raise RuntimeError("Basic Pitch did not produce a MIDI file")
-        temp_midi = midi_candidates[0]
-
-        # Load with pretty_midi for post-processing
-        pm = pretty_midi.PrettyMIDI(temp_midi)
-        # Apply enhancement profile controls
-        prof = (profile or "balanced").lower()
-        if prof == "fast":
-            human_timing = 0.0
-            human_vel = 2 if humanize else 0
-            sustain_flag = False
-            poly_cap = 4
-            min_dur = 0.05
-        elif prof == "accurate":
-            human_timing = 0.0
-            human_vel = 0
-            sustain_flag = False
-            poly_cap = 2
-            min_dur = 0.07
-        else:  # balanced
-            # Make default output sharper and louder without losing accuracy
-            human_timing = 0.012 if humanize else 0.0
-            human_vel = 10 if humanize else 0
-            sustain_flag = add_sustain
-            poly_cap = 3
-            min_dur = 0.06
-
-        pm = _post_process_midi(
-            pm,
-            bpm_estimate,
-            humanize_timing_sec=human_timing,
-            humanize_velocity_range=human_vel,
-            add_sustain=sustain_flag,
-        )
+    # Basic Pitch initial MIDI, using the process-wide cached model and kept in memory
+    pm = _basic_pitch_transcribe(separated_wav)
+    # Apply enhancement profile controls
+    prof = (profile or "balanced").lower()
+    if prof == "fast":
+        human_timing = 0.0
+        human_vel = 2 if humanize else 0
+        sustain_flag = False
+        poly_cap = 4
+        min_dur = 0.05
+    elif prof == "accurate":
+        human_timing = 0.0
+        human_vel = 0
+        sustain_flag = False
+        poly_cap = 2
+        min_dur = 0.07
+    else:  # balanced
+        # Make default output sharper and louder without losing accuracy
+        human_timing = 0.012 if humanize else 0.0
+        human_vel = 10 if humanize else 0
+        sustain_flag = add_sustain
+        poly_cap = 3
+        min_dur = 0.06
+
+    pm = _post_process_midi(
+        pm,
+        bpm_estimate,
+        humanize_timing_sec=human_timing,
+        humanize_velocity_range=human_vel,
+        add_sustain=sustain_flag,
+    )
+    pm = _clean_polyphony(pm, onset_window_sec=0.03, max_notes_per_onset=poly_cap)
+    pm = _limit_pitch_and_length(pm, pitch_min=36, pitch_max=96, min_duration_sec=min_dur)
+
+    # For "accurate" profile, use enhanced post-processing (PTI removed)
+    if prof == "accurate":
+        # Enhanced post-processing without PTI merge
+        pm = _refine_midi_against_audio(pm, separated_wav, bpm=bpm_estimate or 120.0, max_poly=poly_cap)
+        # Re-clean after refine
         pm = _clean_polyphony(pm, onset_window_sec=0.03, max_notes_per_onset=poly_cap)
         pm = _limit_pitch_and_length(pm, pitch_min=36, pitch_max=96, min_duration_sec=min_dur)
 
-        # For "accurate" profile, use enhanced post-processing (PTI removed)
-        if prof == "accurate":
-            # Enhanced post-processing without PTI merge
-            pm = _refine_midi_against_audio(pm, separated_wav, bpm=bpm_estimate or 120.0, max_poly=poly_cap)
-            # Re-clean after refine
-            pm = _clean_polyphony(pm, onset_window_sec=0.03, max_notes_per_onset=poly_cap)
-            pm = _limit_pitch_and_length(pm, pitch_min=36, pitch_max=96, min_duration_sec=min_dur)
-
-        # Ensure only one piano instrument remains
-        if pm.instruments:
-            # Merge notes into first instrument
-            first = pm.instruments[0]
-            for inst in pm.instruments[1:]:
-                first.notes.extend(inst.notes)
-            pm.instruments = [first]
-
-        pm.write(output_mid_path)
-
-    # Stats
-    pm_final = pretty_midi.PrettyMIDI(output_mid_path)
-    total_notes = sum(len(inst.notes) for inst in pm_final.instruments)
-    duration_sec = pm_final.get_end_time()
+    # Ensure only one piano instrument remains
+    if pm.instruments:
+        # Merge notes into first instrument
+        first = pm.instruments[0]
+        for inst in pm.instruments[1:]:
+            first.notes.extend(inst.notes)
+        pm.instruments = [first]
+
+    pm.write(output_mid_path)
+
+    # Stats (from the in-memory MIDI; no need to re-parse the written file)
+    total_notes = sum(len(inst.notes) for inst in pm.instruments)
+    duration_sec = pm.get_end_time()
 
     return {
         "notes": float(total_notes),
@@ -1155,15 +1334,22 @@ def transcribe_to_midi(
     }
 
 
+@functools.lru_cache(maxsize=1)
+def _scan_sf2_dir(sf2_dir: str, mtime_ns: int) -> tuple[str, ...]:
+    # mtime_ns is part of the cache key so adding/removing banks invalidates the listing
+    return tuple(
+        os.path.join(sf2_dir, f) for f in os.listdir(sf2_dir) if f.lower().endswith(".sf2")
+    )
+
+
 def _find_sf2(preferred_name: Optional[str] = None) -> Optional[str]:
     here = os.path.dirname(__file__)
-    candidates: list[str] = []
     # Look under server/soundfonts
     sf2_dir = os.path.join(here, "soundfonts")
-    if os.path.isdir(sf2_dir):
-        for f in os.listdir(sf2_dir):
-            if f.lower().endswith(".sf2"):
-                candidates.append(os.path.join(sf2_dir, f))
+    try:
+        candidates = _scan_sf2_dir(sf2_dir, os.stat(sf2_dir).st_mtime_ns)
+    except (FileNotFoundError, NotADirectoryError):
+        candidates = ()
     # Prefer an explicitly named bank if found
     if preferred_name:
         for c in candidates:
@@ -1209,6 +1395,8 @@ def _ensure_salamander_sfz(extract_from_root_tar: bool = True) -> Optional[str]:
         # Best-effort extraction
         return None
 
+    # The earlier lookup memoized "no SFZ"; rescan now that files were extracted
+    _reset_sfz_cache()
     return _find_sfz()
 
 
@@ -1268,9 +1456,11 @@ def render_midi_to_wav(midi_path: str, out_wav_path: str, preferred_bank: Option
         rate = "44100"
         opts = ["-o", "synth.reverb.active=0"]
 
-    cmd = ["fluidsynth", "-F", out_wav_path, "-r", rate] + opts + [sf2, midi_path]
+    # -q/-i: quiet, no interactive shell. Only stderr is kept (for error reporting) so a
+    # chatty render can never stall on a full stdout pipe.
+    cmd = ["fluidsynth", "-q", "-i", "-F", out_wav_path, "-r", rate] + opts + [sf2, midi_path]
     try:
-        subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
     except FileNotFoundError:
         raise RuntimeError("fluidsynth not found. Install with: brew install fluidsynth")
     except subprocess.CalledProcessError as e:
@@ -1279,21 +1469,23 @@ def render_midi_to_wav(midi_path: str, out_wav_path: str, preferred_bank: Option
         _master_wav_inplace(out_wav_path)
 
 
-def _accent_for_beat_index(beat_idx: int, time_signature_numerator: int = 4) -> int:
+def _accent_pattern(time_signature_numerator: int = 4) -> list[int]:
     if time_signature_numerator == 3:
         # 3/4: strong-weak-weak
-        pattern = [14, 4, 6]
-        return pattern[beat_idx % 3]
+        return [14, 4, 6]
     # default 4/4: strong-weak-medium-weak
-    pattern = [16, 4, 10, 4]
-    return pattern[beat_idx % 4]
+    return [16, 4, 10, 4]
 
 
 def expressive_enhance_midi(pm: pretty_midi.PrettyMIDI,
                              humanize_timing_sec: float = 0.015,
                              humanize_velocity_range: int = 10,
-                             sustain: bool = True) -> pretty_midi.PrettyMIDI:
-    """Professional piano performance enhancement: sophisticated accents, humanization, legato, sustain, and musical expression."""
+                             sustain: bool = True,
+                             rng: Optional[np.random.Generator] = None) -> pretty_midi.PrettyMIDI:
+    """Professional piano performance enhancement: sophisticated accents, humanization, legato, sustain, and musical expression.
+
+    Pass `rng` for reproducible humanization; by default a fresh generator is used per call.
+    """
     beats = pm.get_beats()
     if beats.size == 0:
         beats = np.arange(0, max(1.0, pm.get_end_time() + 1.0), 0.5)
@@ -1302,84 +1494,89 @@ def expressive_enhance_midi(pm: pretty_midi.PrettyMIDI,
     num = 4
     if pm.time_signature_changes:
         num = pm.time_signature_changes[0].numerator
+    accent_pattern = np.array(_accent_pattern(num), dtype=float)
+    # One generator per call (no shared legacy global RNG lock across threads);
+    # random draws are made in bulk per instrument
+    if rng is None:
+        rng = np.random.default_rng()
 
     for inst in pm.instruments:
         # Sort by time for consistent edits
         inst.notes.sort(key=lambda n: (n.start, n.pitch))
+        n_notes = len(inst.notes)
+        if n_notes == 0:
+            continue
 
-        # Professional velocity shaping with musical intelligence
-        for i, n in enumerate(inst.notes):
-            # Beat position for accent calculation
-            j = bisect.bisect_right(beats, n.start) - 1
-            j = max(0, j)
-            
-            # Sophisticated accent system for professional performance
-            accent = _accent_for_beat_index(j, num)
-            
-            # Pitch-based velocity compensation (more nuanced)
-            pitch_comp = int(round(-0.12 * (n.pitch - 60)))  # lower notes slightly louder, more natural
-            
-            # Professional velocity shaping based on note context
-            base_velocity = n.velocity
-            
-            # 1. Beat accent enhancement (stronger on downbeats)
-            beat_strength = accent * 1.3  # Increase accent impact
-            
-            # 2. Musical phrase shaping (louder at phrase beginnings)
-            phrase_boost = 0
-            if i < 3 or (i > 0 and n.start - inst.notes[i-1].start > 0.5):
-                phrase_boost = 8  # Boost phrase starts
-            
-            # 3. Dynamic range expansion for professional sound
-            if base_velocity < 60:
-                # Expand low velocities for better attack
-                base_velocity = int(base_velocity * 1.4)
-            elif base_velocity > 100:
-                # Slightly boost high velocities for maximum impact
-                base_velocity = int(base_velocity * 1.15)
-            
-            # 4. Apply all enhancements
-            final_velocity = int(max(1, min(127, 
-                base_velocity + beat_strength + pitch_comp + phrase_boost)))
-            
-            # 5. Add subtle humanization
-            if humanize_velocity_range > 0:
-                dv = int(np.random.randint(-humanize_velocity_range, humanize_velocity_range + 1))
-                final_velocity = max(1, min(127, final_velocity + dv))
-            
-            n.velocity = final_velocity
+        # Professional velocity shaping with musical intelligence (vectorized over notes)
+        starts = np.fromiter((n.start for n in inst.notes), dtype=float, count=n_notes)
+        pitches = np.fromiter((n.pitch for n in inst.notes), dtype=int, count=n_notes)
+        vels = np.fromiter((n.velocity for n in inst.notes), dtype=int, count=n_notes)
 
-        # Professional timing humanization and legato
-        for i, n in enumerate(inst.notes):
-            if humanize_timing_sec > 0:
-                # More sophisticated timing variation
-                # Reduce jitter on important beats
-                beat_pos = bisect.bisect_right(beats, n.start) - 1
-                beat_pos = max(0, beat_pos)
-                
-                # Less jitter on strong beats (0, 4, 8, etc.)
-                if beat_pos % 4 == 0:
-                    jitter_range = humanize_timing_sec * 0.3  # Less variation on downbeats
-                elif beat_pos % 2 == 0:
-                    jitter_range = humanize_timing_sec * 0.6  # Medium variation on half beats
-                else:
-                    jitter_range = humanize_timing_sec  # Full variation on off-beats
-                
-                jitter = float(np.random.uniform(-jitter_range, jitter_range))
-                n.start = max(0.0, n.start + jitter)
-                n.end = max(n.start + 0.02, n.end + jitter)
-            
-            # Professional legato: extend short gaps for smoother performance
-            if i + 1 < len(inst.notes):
-                next_n = inst.notes[i + 1]
-                gap = next_n.start - n.end
-                if 0.0 < gap < 0.08:  # Slightly larger gap threshold
-                    # More sophisticated legato: vary overlap based on musical context
-                    if gap < 0.03:
-                        overlap = 0.008  # Tight overlap for fast passages
-                    else:
-                        overlap = 0.015  # Gentle overlap for slower passages
-                    n.end = min(next_n.start - 0.002, n.end + (0.08 - gap + overlap))
+        # Beat position for accent calculation
+        beat_idx = np.maximum(0, np.searchsorted(beats, starts, side="right") - 1)
+
+        # 1. Beat accent enhancement (stronger on downbeats)
+        beat_strength = accent_pattern[beat_idx % accent_pattern.size] * 1.3
+
+        # Pitch-based velocity compensation: lower notes slightly louder, more natural
+        pitch_comp = np.rint(-0.12 * (pitches - 60))
+
+        # 2. Musical phrase shaping (louder at phrase beginnings)
+        phrase_start = np.zeros(n_notes, dtype=bool)
+        phrase_start[:3] = True
+        phrase_start[1:] |= np.diff(starts) > 0.5
+        phrase_boost = np.where(phrase_start, 8, 0)
+
+        # 3. Dynamic range expansion: lift low velocities for better attack,
+        # slightly boost high velocities for maximum impact
+        base_velocity = np.where(
+            vels < 60, (vels * 1.4).astype(int),
+            np.where(vels > 100, (vels * 1.15).astype(int), vels),
+        )
+
+        # 4. Apply all enhancements
+        final_velocity = np.clip(
+            (base_velocity + beat_strength + pitch_comp + phrase_boost).astype(int), 1, 127
+        )
+
+        # 5. Add subtle humanization
+        if humanize_velocity_range > 0:
+            dv = rng.integers(-humanize_velocity_range, humanize_velocity_range + 1, size=n_notes)
+            final_velocity = np.clip(final_velocity + dv, 1, 127)
+
+        for n, v in zip(inst.notes, final_velocity.tolist()):
+            n.velocity = v
+
+        # Professional timing humanization and legato (vectorized over notes)
+        ends = np.fromiter((n.end for n in inst.notes), dtype=float, count=n_notes)
+        if humanize_timing_sec > 0:
+            # Reduce jitter on important beats: less on downbeats (0, 4, 8, ...),
+            # medium on half beats, full variation on off-beats
+            jitter_range = np.select(
+                [beat_idx % 4 == 0, beat_idx % 2 == 0],
+                [humanize_timing_sec * 0.3, humanize_timing_sec * 0.6],
+                default=humanize_timing_sec,
+            )
+            jitter = rng.uniform(-1.0, 1.0, size=n_notes) * jitter_range
+            new_starts = np.maximum(0.0, starts + jitter)
+            new_ends = np.maximum(new_starts + 0.02, ends + jitter)
+        else:
+            new_starts = starts
+            new_ends = ends
+
+        # Professional legato: extend short gaps for smoother performance.
+        # Gaps are measured against the next note's pre-jitter onset.
+        if n_notes > 1:
+            gaps = starts[1:] - new_ends[:-1]
+            legato = (gaps > 0.0) & (gaps < 0.08)
+            # Tight overlap for fast passages, gentle overlap for slower passages
+            overlap = np.where(gaps < 0.03, 0.008, 0.015)
+            extended = np.minimum(starts[1:] - 0.002, new_ends[:-1] + (0.08 - gaps + overlap))
+            new_ends[:-1] = np.where(legato, extended, new_ends[:-1])
+
+        for n, st, en in zip(inst.notes, new_starts.tolist(), new_ends.tolist()):
+            n.start = st
+            n.end = en
 
         # Professional sustain pedal control for rich, natural sound
         if sustain and inst.notes:
@@ -1447,6 +1644,67 @@ def perform_midi_ml(input_mid_path: str, output_mid_path: str, performer_url: st
         f.write(out_bytes)
 
 
+@functools.lru_cache(maxsize=1)
+def _http_session():
+    """Shared requests session so repeated stem downloads reuse pooled connections."""
+    return requests.Session()
+
+
+def _download_to_file(url: str, dest_path: str, timeout: float = 180, chunk_size: int = 1 << 20) -> None:
+    """Stream a URL to disk in chunks so large audio never sits in memory whole."""
+    with _http_session().get(url, timeout=timeout, stream=True) as r:
+        r.raise_for_status()
+        with open(dest_path, "wb") as f:
+            for chunk in r.iter_content(chunk_size=chunk_size):
+                if chunk:
+                    f.write(chunk)
+
+
+_REPLICATE_VERSION_TTL_SEC = 3600.0
+_replicate_versions: dict[tuple[str, str], tuple[float, str]] = {}
+
+
+def _replicate_latest_version(client, model_slug: str) -> str:
+    """
+    Resolve model_slug's latest version id, cached per (API token, slug) for an hour
+    so each cloud job does not pay a models.get round-trip.
+    """
+    key = (os.environ.get("REPLICATE_API_TOKEN") or "", model_slug)
+    now = time.time()
+    hit = _replicate_versions.get(key)
+    if hit is not None and now - hit[0] < _REPLICATE_VERSION_TTL_SEC:
+        return hit[1]
+    version_id = client.models.get(model_slug).latest_version.id
+    _replicate_versions[key] = (now, version_id)
+    return version_id
+
+
+def _poll_prediction(client, pred, timeout_sec: float, timeout_message: str,
+                     initial_delay: float = 0.25, max_delay: float = 8.0,
+                     wake=None, on_poll=None):
+    """
+    Poll a Replicate prediction until it settles. The interval starts short so quick
+    jobs return promptly and grows by 1.6x per poll up to max_delay for long jobs.
+    If `wake` (a threading.Event, e.g. set by a webhook) fires, the current wait ends
+    early; `on_poll` is called with each refreshed prediction.
+    """
+    deadline = time.time() + timeout_sec
+    delay = initial_delay
+    while pred.status not in ("succeeded", "failed", "canceled"):
+        if time.time() > deadline:
+            raise TimeoutError(timeout_message)
+        if wake is not None:
+            wake.wait(delay)
+            wake.clear()
+        else:
+            time.sleep(delay)
+        delay = min(max_delay, delay * 1.6)
+        pred = client.predictions.get(pred.id)
+        if on_poll is not None:
+            on_poll(pred)
+    return pred
+
+
 def perform_audio_cloud(
     input_wav_path: str,
     output_wav_path: str,
@@ -1483,8 +1741,7 @@ def perform_audio_cloud(
                 continue
 
     # Get model version
-    model = client.models.get(slug)
-    version_id = model.latest_version.id
+    version_id = _replicate_latest_version(client, slug)
 
     # Build input. Different models have different schemas; try common fields.
     # Primary attempt: generic mastering with optional references/strength.
@@ -1512,12 +1769,7 @@ def perform_audio_cloud(
         raise RuntimeError("Failed to start cloud performance")
 
     # Poll until done
-    deadline = time.time() + 900
-    while pred.status not in ("succeeded", "failed", "canceled"):
-        if time.time() > deadline:
-            raise TimeoutError("Cloud performance timed out")
-        time.sleep(2)
-        pred = client.predictions.get(pred.id)
+    pred = _poll_prediction(client, pred, 900, "Cloud performance timed out")
 
     if pred.status != "succeeded":
         raise RuntimeError(f"Cloud performance failed: {pred.status}")
@@ -1541,13 +1793,10 @@ def perform_audio_cloud(
         raise RuntimeError("Cloud performance returned no downloadable audio URL")
 
     # Download the mastered/performed audio
-    import requests as _rq
-    r = _rq.get(out_url, timeout=180)
-    r.raise_for_status()
-    with open(output_wav_path, "wb") as f:
-        f.write(r.content)
+    _download_to_file(out_url, output_wav_path, timeout=180)
 
 
+@functools.lru_cache(maxsize=None)
 def _find_sfz(preferred_name: Optional[str] = None) -> Optional[str]:
     here = os.path.dirname(__file__)
     candidates: list[str] = []
@@ -1564,6 +1813,7 @@ def _find_sfz(preferred_name: Optional[str] = None) -> Optional[str]:
     return candidates[0] if candidates else None
 
 
+@functools.lru_cache(maxsize=None)
 def _sfizz_binary() -> Optional[str]:
     # Prefer PATH
     p = shutil.which("sfizz_render")
@@ -1577,6 +1827,12 @@ def _sfizz_binary() -> Optional[str]:
     return None
 
 
+def _reset_sfz_cache() -> None:
+    """Forget memoized SFZ/sfizz lookups (after provisioning new banks, or in tests)."""
+    _find_sfz.cache_clear()
+    _sfizz_binary.cache_clear()
+
+
 def render_midi_to_wav_sfizz(midi_path: str, out_wav_path: str, preferred_sfz: Optional[str] = None, sr: int = 48000) -> None:
     """Render using sfizz CLI. Requires `sfizz_render` to be installed (brew install sfizz)."""
     sfz = _find_sfz(preferred_sfz)
@@ -1597,7 +1853,8 @@ def render_midi_to_wav_sfizz(midi_path: str, out_wav_path: str, preferred_sfz: O
     for cmd in tried:
         try:
             # Add timeout to prevent hanging (5 minutes max)
-            subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=300)
+            # stdout (render progress) is discarded; stderr is kept for error reporting
+            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=300)
             return
         except subprocess.TimeoutExpired:
             raise RuntimeError("sfizz_render timed out after 5 minutes. The process may be stuck.")
@@ -1619,15 +1876,22 @@ def trim_midi(input_mid_path: str, output_mid_path: str, start_sec: float = 0.0,
     out = pretty_midi.PrettyMIDI(resolution=pm.resolution)
     for inst in pm.instruments:
         new_inst = pretty_midi.Instrument(program=inst.program, is_drum=inst.is_drum, name=inst.name)
-        for n in inst.notes:
-            if n.end <= start_sec or n.start >= end_sec:
-                continue
-            ns = max(0.0, n.start - start_sec)
-            ne = max(ns + 0.01, min(end_sec, n.end) - start_sec)
-            new_inst.notes.append(pretty_midi.Note(velocity=n.velocity, pitch=n.pitch, start=ns, end=ne))
-        for cc in inst.control_changes:
-            if start_sec <= cc.time <= end_sec:
-                new_inst.control_changes.append(pretty_midi.ControlChange(number=cc.number, value=cc.value, time=max(0.0, cc.time - start_sec)))
+        # Select overlapping notes/CCs with NumPy masks; only survivors are allocated
+        starts, ends, pitches, vels = _note_fields(inst.notes)
+        keep = (ends > start_sec) & (starts < end_sec)
+        ns = np.maximum(0.0, starts[keep] - start_sec)
+        ne = np.maximum(ns + 0.01, np.minimum(end_sec, ends[keep]) - start_sec)
+        new_inst.notes = [
+            pretty_midi.Note(velocity=v, pitch=p, start=a, end=b)
+            for v, p, a, b in zip(vels[keep].tolist(), pitches[keep].tolist(), ns.tolist(), ne.tolist())
+        ]
+        cc_times = np.fromiter((cc.time for cc in inst.control_changes), dtype=float, count=len(inst.control_changes))
+        cc_keep = np.flatnonzero((cc_times >= start_sec) & (cc_times <= end_sec)).tolist()
+        new_inst.control_changes = [
+            pretty_midi.ControlChange(number=inst.control_changes[i].number, value=inst.control_changes[i].value,
+                                      time=max(0.0, inst.control_changes[i].time - start_sec))
+            for i in cc_keep
+        ]
         out.instruments.append(new_inst)
     out.write(output_mid_path)
 
@@ -1649,7 +1913,7 @@ def melody_to_midi(
     Extract monophonic melody with PYIN and write a simple one-track piano MIDI.
     Returns stats dict.
     """
-    y, sr = librosa.load(input_wav_path, sr=22050, mono=True)
+    y, sr = _load_audio(input_wav_path, sr=22050, mono=True)
     # F0 estimation (NaN for unvoiced)
     f0, _, voicing = librosa.pyin(
         y,
@@ -1658,39 +1922,38 @@ def melody_to_midi(
         frame_length=frame_length,
         hop_length=hop_length,
     )
-    times = librosa.frames_to_time(np.arange(len(f0)), sr=sr, hop_length=hop_length)
     # Convert to MIDI note numbers
     midi_pitch = np.where(np.isfinite(f0) & (voicing > 0.5), librosa.hz_to_midi(f0), np.nan)
 
-    # Group contiguous frames into notes
+    # Group contiguous frames into notes. Voiced runs are located with NumPy; within a
+    # run a note continues while the rounded pitch stays within ±1 semitone of the
+    # note's first frame, so Python only visits note boundaries, not every frame.
     notes: list[tuple[float, float, int]] = []  # (start_s, end_s, pitch)
-    start_idx = None
-    cur_pitch = None
-    for i, p in enumerate(midi_pitch):
-        if np.isfinite(p):
-            p_round = int(np.round(p))
-            if start_idx is None:
-                start_idx = i
-                cur_pitch = p_round
-            elif abs(p_round - (cur_pitch or p_round)) <= 1:
-                # continue same note
-                pass
-            else:
-                # end previous note
-                if start_idx is not None:
-                    if i - start_idx >= min_note_len_frames:
-                        notes.append((times[start_idx], times[i], int(cur_pitch)))
-                start_idx = i
-                cur_pitch = p_round
-        else:
-            if start_idx is not None and cur_pitch is not None:
-                if i - start_idx >= min_note_len_frames:
-                    notes.append((times[start_idx], times[i], int(cur_pitch)))
-            start_idx = None
-            cur_pitch = None
-    if start_idx is not None and cur_pitch is not None:
-        if len(times) - 1 - start_idx >= min_note_len_frames:
-            notes.append((times[start_idx], times[min(len(times)-1, start_idx+min_note_len_frames)], int(cur_pitch)))
+    n_frames = len(midi_pitch)
+
+    # Frame index → seconds (same as librosa.frames_to_time), only for note boundaries
+    def frame_time(i: int) -> float:
+        return (i * hop_length) / sr
+
+    voiced = np.isfinite(midi_pitch)
+    pr = np.round(np.where(voiced, midi_pitch, 0.0)).astype(np.int16)
+    edges = np.diff(np.concatenate(([0], voiced.astype(np.int8), [0])))
+    run_starts = np.flatnonzero(edges == 1)
+    run_ends = np.flatnonzero(edges == -1)  # exclusive
+    for rs, re_ in zip(run_starts.tolist(), run_ends.tolist()):
+        s = rs
+        while s < re_:
+            cur_pitch = int(pr[s])
+            jumps = np.flatnonzero(np.abs(pr[s + 1:re_] - cur_pitch) > 1)
+            e = s + 1 + int(jumps[0]) if jumps.size else re_
+            if e < n_frames:
+                # Ended by a pitch jump or an unvoiced frame at index e
+                if e - s >= min_note_len_frames:
+                    notes.append((frame_time(s), frame_time(e), cur_pitch))
+            elif n_frames - 1 - s >= min_note_len_frames:
+                # Still sounding at the last frame
+                notes.append((frame_time(s), frame_time(min(n_frames - 1, s + min_note_len_frames)), cur_pitch))
+            s = e
 
     pm = pretty_midi.PrettyMIDI()
     inst = pretty_midi.Instrument(program=0)  # Acoustic Grand Piano
@@ -1715,26 +1978,93 @@ def melody_to_midi(
 
 
 # --- HQ chords: arrange transcribed MIDI into piano-friendly chord voicings ---
+def _pc_bitmask(pitch_classes) -> int:
+    mask = 0
+    for p in pitch_classes:
+        mask |= 1 << (p % 12)
+    return mask
+
+
+# (template_mask, root_pc, sorted chord pcs) in match-priority order: major before minor per root
+_CHORD_TEMPLATES: list[tuple[int, int, tuple[int, ...]]] = [
+    (_pc_bitmask(pcs), r, tuple(sorted(pcs)))
+    for r in range(12)
+    for pcs in ({r % 12, (r + 4) % 12, (r + 7) % 12}, {r % 12, (r + 3) % 12, (r + 7) % 12})
+]
+
+
+@functools.lru_cache(maxsize=None)
+def _classify_chord_mask(mask: int) -> tuple[int, tuple[int, ...]] | None:
+    # At most 4096 distinct pitch-class sets, so every answer is memoized
+    best = None
+    best_score = -1
+    for tmask, root, chord_pcs in _CHORD_TEMPLATES:
+        score = (tmask & mask).bit_count()
+        if score > best_score:
+            best = (root, chord_pcs)
+            best_score = score
+    return best
+
+
 def _classify_chord(pitch_classes: list[int]) -> tuple[int, list[int]] | None:
     """Return (root_pc, chord_pcs) using simple template matching (maj/min/7).
-    chord_pcs are relative to MIDI pitch classes (0-11)."""
+    chord_pcs are relative to MIDI pitch classes (0-11).
+    Pitch classes are packed into a 12-bit mask and scored against precomputed
+    template masks with popcount."""
     if not pitch_classes:
         return None
-    pcs = set(p % 12 for p in pitch_classes)
-    best = None
-    best_score = -1
-    for r in range(12):
-        major = {(r) % 12, (r + 4) % 12, (r + 7) % 12}
-        minor = {(r) % 12, (r + 3) % 12, (r + 7) % 12}
-        score_major = len(major & pcs)
-        score_minor = len(minor & pcs)
-        if score_major > best_score:
-            best = (r, list(sorted(major)))
-            best_score = score_major
-        if score_minor > best_score:
-            best = (r, list(sorted(minor)))
-            best_score = score_minor
-    return best
+    best = _classify_chord_mask(_pc_bitmask(pitch_classes))
+    if best is None:
+        return None
+    return best[0], list(best[1])
+
+
+def _grid_windows(end_time: float, grid_sec: float) -> tuple[np.ndarray, np.ndarray]:
+    """[t, t2) blocks of grid_sec covering [0, end_time), with t = k * grid_sec (no accumulated drift)."""
+    n_steps = int(np.ceil(end_time / grid_sec)) if end_time > 0 else 0
+    t_arr = np.arange(n_steps) * grid_sec
+    t2_arr = np.minimum(t_arr + grid_sec, end_time)
+    return t_arr, t2_arr
+
+
+def _pm_to_soa(pm: pretty_midi.PrettyMIDI) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Flatten every note of every instrument into (starts, ends, pitches) arrays. Times
+    stay float64 so comparisons against the arranger grid match the Note objects
+    exactly; pitches fit in int8.
+    """
+    notes = [n for tr in pm.instruments for n in tr.notes]
+    starts, ends, pitches, _ = _note_fields(notes)
+    return starts, ends, pitches.astype(np.int8)
+
+
+def _grid_pc_masks(soa: tuple[np.ndarray, np.ndarray, np.ndarray], t_arr: np.ndarray, t2_arr: np.ndarray) -> np.ndarray:
+    """
+    12-bit mask of the pitch classes sounding in every (ascending) grid block [t, t2).
+    Each note's span of blocks (start < t2 and end > t) is found with searchsorted and
+    accumulated per pitch class with a difference array, in O(N log G + 12 G) without
+    visiting blocks one at a time in Python.
+    """
+    n_steps = t_arr.size
+    starts, ends, pitches = soa
+    first = np.searchsorted(t2_arr, starts, side="right")  # first block with t2 > start
+    stop = np.searchsorted(t_arr, ends, side="left")       # blocks [first, stop) have t < end
+    spans = first < stop
+    pcs = pitches[spans] % 12
+    diff = np.zeros((12, n_steps + 1), dtype=np.int32)
+    np.add.at(diff, (pcs, first[spans]), 1)
+    np.add.at(diff, (pcs, stop[spans]), -1)
+    active = np.cumsum(diff[:, :n_steps], axis=1) > 0
+    return (active.astype(np.int64) << np.arange(12, dtype=np.int64)[:, None]).sum(axis=0)
+
+
+def _grid_chords(soa: tuple[np.ndarray, np.ndarray, np.ndarray], t_arr: np.ndarray, t2_arr: np.ndarray) -> list[tuple[int, list[int]] | None]:
+    """Classify the chord sounding in every grid block [t, t2) from its pitch-class mask."""
+    chords: list[tuple[int, list[int]] | None] = []
+    for mask in _grid_pc_masks(soa, t_arr, t2_arr).tolist():
+        best = _classify_chord_mask(mask) if mask else None
+        chords.append((best[0], list(best[1])) if best else None)
+    return chords
 
 
 def _arrange_piano_chords(pm_in: pretty_midi.PrettyMIDI, bpm: float | None = None, bass_octave: int = 3, treble_center: int = 60, sustain: bool = True) -> pretty_midi.PrettyMIDI:
@@ -1747,16 +2077,10 @@ def _arrange_piano_chords(pm_in: pretty_midi.PrettyMIDI, bpm: float | None = Non
         return pm_in
     out = pretty_midi.PrettyMIDI()
     inst = pretty_midi.Instrument(program=0)
-    t = 0.0
-    while t < end_time:
-        t2 = min(end_time, t + grid_sec)
-        # collect active notes in [t, t2)
-        active_pcs: list[int] = []
-        for tr in pm_in.instruments:
-            for n in tr.notes:
-                if n.start < t2 and n.end > t:
-                    active_pcs.append(n.pitch % 12)
-        clas = _classify_chord(active_pcs)
+    # Chord per block is computed for all blocks up front; notes are emitted serially
+    t_arr, t2_arr = _grid_windows(end_time, grid_sec)
+    chords = _grid_chords(_pm_to_soa(pm_in), t_arr, t2_arr)
+    for t, t2, clas in zip(t_arr.tolist(), t2_arr.tolist(), chords):
         if clas:
             root_pc, chord_pcs = clas
             # Bass root
@@ -1766,16 +2090,10 @@ def _arrange_piano_chords(pm_in: pretty_midi.PrettyMIDI, bpm: float | None = Non
             voiced: list[int] = []
             for pc in chord_pcs:
                 # lift to nearest above treble_center-7
-                p = pc
-                while p < treble_center - 7:
-                    p += 12
-                while p > treble_center + 9:
-                    p -= 12
-                voiced.append(p)
+                voiced.append(_voice_pitch_class(pc, treble_center))
             voiced = sorted(set(voiced))
             for vp in voiced:
                 inst.notes.append(pretty_midi.Note(velocity=85, pitch=int(vp), start=float(t), end=float(t2)))
-        t = t2
     out.instruments.append(inst)
     if sustain:
         out = _post_process_midi(out, bpm, add_sustain=True)
@@ -1784,16 +2102,21 @@ def _arrange_piano_chords(pm_in: pretty_midi.PrettyMIDI, bpm: float | None = Non
 
 def piano_cover_from_audio_hq(input_wav_path: str, output_mid_path: str, use_demucs: bool = False) -> Dict[str, Optional[float]]:
     # PTI removed - use Basic Pitch instead
-    tmp_mid = tempfile.mkstemp(suffix=".mid")[1]
-    stats = transcribe_to_midi(input_wav_path, tmp_mid, use_demucs=use_demucs, profile="fast")
-    pm = pretty_midi.PrettyMIDI(tmp_mid)
+    with tempfile.NamedTemporaryFile(suffix=".mid", delete=False) as tf:
+        tmp_mid = tf.name
+    try:
+        stats = transcribe_to_midi(input_wav_path, tmp_mid, use_demucs=use_demucs, profile="fast")
+        pm = pretty_midi.PrettyMIDI(tmp_mid)
+    finally:
+        try:
+            os.remove(tmp_mid)
+        except Exception:
+            pass
     pm_out = _arrange_piano_chords(pm, bpm=stats.get("bpm_estimate") or 120.0)
     pm_out.write(output_mid_path)
-    os.remove(tmp_mid)
-    pm_final = pretty_midi.PrettyMIDI(output_mid_path)
     return {
-        "notes": float(sum(len(i.notes) for i in pm_final.instruments)),
-        "duration_sec": float(pm_final.get_end_time()),
+        "notes": float(sum(len(i.notes) for i in pm_out.instruments)),
+        "duration_sec": float(pm_out.get_end_time()),
         "bpm_estimate": stats.get("bpm_estimate"),
     }
 
@@ -1812,30 +2135,18 @@ def _arrange_piano_style(
     end_time = pm_in.get_end_time()
     out = pretty_midi.PrettyMIDI()
     inst = pretty_midi.Instrument(program=0)
-    t = 0.0
-    while t < end_time:
-        t2 = min(end_time, t + grid_sec)
-        # Active chord set
-        active_pcs: list[int] = []
-        for tr in pm_in.instruments:
-            for n in tr.notes:
-                if n.start < t2 and n.end > t:
-                    active_pcs.append(n.pitch % 12)
-        clas = _classify_chord(active_pcs)
+    # Chord per block (from the active note set) is computed for all blocks up front
+    t_arr, t2_arr = _grid_windows(end_time, grid_sec)
+    chords = _grid_chords(_pm_to_soa(pm_in), t_arr, t2_arr)
+    for t, t2, clas in zip(t_arr.tolist(), t2_arr.tolist(), chords):
         if not clas:
-            t = t2
             continue
         root_pc, chord_pcs = clas
         # Compute pitches
         bass_pitch = root_pc + bass_octave * 12
         treble_pitches: list[int] = []
         for pc in chord_pcs:
-            p = pc
-            while p < treble_center - 7:
-                p += 12
-            while p > treble_center + 9:
-                p -= 12
-            treble_pitches.append(p)
+            treble_pitches.append(_voice_pitch_class(pc, treble_center))
         treble_pitches = sorted(set(treble_pitches))
 
         if style == "arpeggio":
@@ -1864,7 +2175,6 @@ def _arrange_piano_style(
             inst.notes.append(pretty_midi.Note(velocity=72, pitch=int(bass_pitch), start=float(t), end=float(t2)))
             for p in treble_pitches:
                 inst.notes.append(pretty_midi.Note(velocity=85, pitch=int(p), start=float(t), end=float(t2)))
-        t = t2
     out.instruments.append(inst)
     # Light sustain for cohesion
     out = _post_process_midi(out, bpm, add_sustain=True)
@@ -1878,23 +2188,68 @@ def piano_cover_from_audio_style(
     use_demucs: bool = False,
 ) -> Dict[str, Optional[float]]:
     # PTI removed - use Basic Pitch instead
-    stats = transcribe_to_midi(input_wav_path, tmp_mid, use_demucs=use_demucs, profile="fast")
-    pm = pretty_midi.PrettyMIDI(tmp_mid)
+    with tempfile.NamedTemporaryFile(suffix=".mid", delete=False) as tf:
+        tmp_mid = tf.name
+    try:
+        stats = transcribe_to_midi(input_wav_path, tmp_mid, use_demucs=use_demucs, profile="fast")
+        pm = pretty_midi.PrettyMIDI(tmp_mid)
+    finally:
+        try:
+            os.remove(tmp_mid)
+        except Exception:
+            pass
     pm_out = _arrange_piano_style(pm, bpm=stats.get("bpm_estimate") or 120.0, style=style)
     pm_out.write(output_mid_path)
-    try:
-        os.remove(tmp_mid)
-    except Exception:
-        pass
-    pm_final = pretty_midi.PrettyMIDI(output_mid_path)
     return {
-        "notes": float(sum(len(i.notes) for i in pm_final.instruments)),
-        "duration_sec": float(pm_final.get_end_time()),
+        "notes": float(sum(len(i.notes) for i in pm_out.instruments)),
+        "duration_sec": float(pm_out.get_end_time()),
         "bpm_estimate": stats.get("bpm_estimate"),
     }
 
 
 # --- Pure Basic Pitch (website-style output) ---
+_BASIC_PITCH_LOCK = threading.Lock()
+
+
+@functools.lru_cache(maxsize=1)
+def _load_basic_pitch_model():
+    from basic_pitch.inference import Model, ICASSP_2022_MODEL_PATH  # type: ignore
+    return Model(ICASSP_2022_MODEL_PATH)
+
+
+def _basic_pitch_model():
+    """Load the ICASSP 2022 Basic Pitch model once per process (basic-pitch >= 0.4).
+
+    lru_cache alone lets concurrent first callers (the warm-up thread, job threads,
+    the parallel passes of transcribe_to_midi_enhanced) each load their own copy.
+    """
+    with _BASIC_PITCH_LOCK:
+        return _load_basic_pitch_model()
+
+
+def _basic_pitch_transcribe(audio_path: str) -> pretty_midi.PrettyMIDI:
+    """
+    Run Basic Pitch with its default thresholds and return the MIDI in memory,
+    reusing the process-wide model instead of reloading it on every request.
+    """
+    # Lazy import to avoid hard dependency at server startup
+    try:
+        from basic_pitch.inference import predict, ICASSP_2022_MODEL_PATH  # type: ignore
+    except Exception as e:
+        raise RuntimeError(
+            "Basic Pitch is not installed. Install with: \n"
+            "  pip install basic-pitch\n"
+            f"Import error: {e}"
+        )
+    try:
+        model = _basic_pitch_model()
+    except Exception:
+        # basic-pitch 0.3.x has no Model wrapper; predict() loads from the path
+        model = ICASSP_2022_MODEL_PATH
+    _, midi_data, _ = predict(audio_path, model)
+    return midi_data
+
+
 def transcribe_to_midi_pure_basic_pitch(
     input_wav_path: str,
     output_mid_path: str,
@@ -1911,52 +2266,23 @@ def transcribe_to_midi_pure_basic_pitch(
     # This is exactly like the Basic Pitch website
     separated_wav = input_wav_path  # No demucs in pure mode
 
-    # Use Basic Pitch to produce raw MIDI (no post-processing)
-    with tempfile.TemporaryDirectory() as tmpdir:
-        # Lazy import to avoid hard dependency at server startup
-        try:
-            from basic_pitch.inference import predict_and_save, ICASSP_2022_MODEL_PATH  # type: ignore
-        except Exception as e:
-            raise RuntimeError(
-                "Basic Pitch is not installed. Install with: \n"
-                "  pip install basic-pitch\n"
-                f"Import error: {e}"
-            )
-        
-        print(f"[PURE BASIC PITCH] Starting transcription of: {input_wav_path}")
-        print(f"[PURE BASIC PITCH] Using ICASSP 2022 model - NO POST-PROCESSING")
-        
-        # Call Basic Pitch with version-tolerant wrapper
-        try:
-            predict_and_save(
-                [separated_wav], tmpdir, True, False, False, False, ICASSP_2022_MODEL_PATH,
-            )
-        except TypeError:
-            predict_and_save(
-                [separated_wav], True, False, False, False, ICASSP_2022_MODEL_PATH, tmpdir,
-            )
+    print(f"[PURE BASIC PITCH] Starting transcription of: {input_wav_path}")
+    print(f"[PURE BASIC PITCH] Using ICASSP 2022 model - NO POST-PROCESSING")
 
-        # Find the produced MIDI file
-        midi_candidates = [
-            os.path.join(tmpdir, f) for f in os.listdir(tmpdir) if f.lower().endswith(".mid") or f.lower().endswith(".midi")
-        ]
-        if not midi_candidates:
-            raise RuntimeError("Basic Pitch did not produce a MIDI file")
-        temp_midi = midi_candidates[0]
+    # Use Basic Pitch to produce raw MIDI (no post-processing)
+    midi_data = _basic_pitch_transcribe(separated_wav)
 
-        print(f"[PURE BASIC PITCH] Raw MIDI generated: {temp_midi}")
-        print(f"[PURE BASIC PITCH] Copying raw output - NO MODIFICATIONS")
+    print(f"[PURE BASIC PITCH] Writing raw output - NO MODIFICATIONS")
 
-        # Copy the raw Basic Pitch output directly - NO POST-PROCESSING
-        shutil.copy2(temp_midi, output_mid_path)
+    # Write the raw Basic Pitch output directly - NO POST-PROCESSING
+    midi_data.write(output_mid_path)
 
-    # Load final MIDI for stats only (don't modify it)
-    pm_final = pretty_midi.PrettyMIDI(output_mid_path)
-    total_notes = sum(len(inst.notes) for inst in pm_final.instruments)
-    duration_sec = pm_final.get_end_time()
+    # Stats from the in-memory MIDI (don't modify it, don't re-parse the file)
+    total_notes = sum(len(inst.notes) for inst in midi_data.instruments)
+    duration_sec = midi_data.get_end_time()
     
     # Estimate BPM from the raw output (no AI, just math)
-    bpm_estimate = _estimate_bpm_from_midi(pm_final)
+    bpm_estimate = _estimate_bpm_from_midi(midi_data)
 
     print(f"[PURE BASIC PITCH] Completed: {total_notes} notes, {duration_sec:.1f}s duration")
     print(f"[PURE BASIC PITCH] Output is EXACTLY like the website - no AI processing")
@@ -1989,142 +2315,92 @@ def transcribe_to_midi_hybrid(
     # IMPORTANT: Hybrid mode uses Basic Pitch for transcription, AI for enhancement only
     separated_wav = input_wav_path  # No demucs in hybrid mode
 
-    # Use Basic Pitch to produce raw MIDI (same as Pure mode)
-    with tempfile.TemporaryDirectory() as tmpdir:
-        try:
-            from basic_pitch.inference import predict_and_save, ICASSP_2022_MODEL_PATH  # type: ignore
-        except Exception as e:
-            raise RuntimeError(
-                "Basic Pitch is not installed. Install with: \n"
-                "  pip install basic-pitch\n"
-                "PTI fallback has been removed as it was not producing good results."
-            )
-        
-        print(f"[HYBRID] Starting Basic Pitch transcription of: {input_wav_path}")
-        print(f"[HYBRID] Using ICASSP 2022 model + AI enhancement")
-        
-        # Call Basic Pitch with version-tolerant wrapper
-        try:
-            predict_and_save(
-                [separated_wav], tmpdir, True, False, False, False, ICASSP_2022_MODEL_PATH,
-            )
-        except TypeError:
-            predict_and_save(
-                [separated_wav], True, False, False, False, ICASSP_2022_MODEL_PATH, tmpdir,
-            )
+    print(f"[HYBRID] Starting Basic Pitch transcription of: {input_wav_path}")
+    print(f"[HYBRID] Using ICASSP 2022 model + AI enhancement")
 
-        # Find the produced MIDI file
-        midi_candidates = [
-            os.path.join(tmpdir, f) for f in os.listdir(tmpdir) if f.lower().endswith(".mid") or f.lower().endswith(".midi")
-        ]
-        if not midi_candidates:
-            raise RuntimeError("Basic Pitch did not produce a MIDI file")
-        temp_midi = midi_candidates[0]
+    # Use Basic Pitch to produce raw MIDI (same as Pure mode)
+    pm = _basic_pitch_transcribe(separated_wav)
 
-        print(f"[HYBRID] Basic Pitch MIDI generated: {temp_midi}")
-        print(f"[HYBRID] Applying AI enhancement: volume boost + chord cleanup")
+    print(f"[HYBRID] Applying AI enhancement: volume boost + chord cleanup")
 
-        # Load the Basic Pitch output for AI enhancement
-        pm = pretty_midi.PrettyMIDI(temp_midi)
-        
-        # AI Enhancement 1: Much sharper velocity boost for louder/more prominent MIDI
-        for inst in pm.instruments:
-            for note in inst.notes:
-                # Professional velocity shaping: more nuanced than simple boost
-                original_velocity = note.velocity
-                
-                # Sophisticated velocity enhancement based on note context
-                if original_velocity < 50:
-                    # Expand low velocities significantly for better attack and presence
-                    enhanced_velocity = int(original_velocity * 1.8)
-                elif original_velocity < 80:
-                    # Moderate boost for mid-range velocities
-                    enhanced_velocity = int(original_velocity * 1.5)
-                elif original_velocity < 100:
-                    # Slight boost for high velocities
-                    enhanced_velocity = int(original_velocity * 1.3)
-                else:
-                    # Maximum boost for highest velocities
-                    enhanced_velocity = int(original_velocity * 1.2)
-                
-                # Ensure we don't exceed MIDI limits
-                note.velocity = min(127, max(64, enhanced_velocity))
-        
-        # AI Enhancement 2: Very light chord cleanup (less aggressive)
-        pm = _clean_polyphony(pm, onset_window_sec=0.02, max_notes_per_onset=6)  # Much less aggressive
-        
-        # AI Enhancement 3: Enhanced timing and musicality (more noticeable)
-        bpm_estimate = _estimate_bpm_from_midi(pm)
-        pm = _post_process_midi(
-            pm,
-            bpm_estimate,
-            humanize_timing_sec=0.008,  # tighter, more professional
-            humanize_velocity_range=15,   # more dynamic shaping for professional sound
-            add_sustain=True,            # richer
-        )
-        
-        # AI Enhancement 4: Very light note filtering (keep more notes)
-        pm = _limit_pitch_and_length(pm, pitch_min=21, pitch_max=108, min_duration_sec=0.045)  # Keep more notes
-        
-        # AI Enhancement 5: Professional velocity shaping for maximum impact
-        for inst in pm.instruments:
-            for note in inst.notes:
-                # Advanced velocity shaping for professional performance
-                current_velocity = note.velocity
-                
-                # 1. Note length-based velocity adjustment
-                note_duration = note.end - note.start
-                if note_duration < 0.1:
-                    # Short notes get velocity boost for crisp attack
-                    current_velocity = int(current_velocity * 1.15)
-                elif note_duration > 0.5:
-                    # Long notes get slight boost for sustained presence
-                    current_velocity = int(current_velocity * 1.05)
-                
-                # 2. Pitch-based velocity refinement
-                if note.pitch < 48:  # Low notes
-                    current_velocity = int(current_velocity * 1.1)  # Slightly louder for bass presence
-                elif note.pitch > 84:  # High notes
-                    current_velocity = int(current_velocity * 1.05)  # Gentle boost for clarity
-                
-                # 3. Ensure final velocity is within professional range
-                note.velocity = max(64, min(127, current_velocity))
-        
-        # AI Enhancement 6: Light chord filling to reduce gaps
-        pm = _fill_chord_gaps(pm, max_gap_sec=0.8, fill_velocity=60, max_fill_notes=2)
-        
-        # Final cleanup to reduce noise:
-        #  - gate ultra-short/low-velocity notes
-        #  - tighten polyphony per onset
-        #  - light velocity smoothing
-        for inst in pm.instruments:
-            # Gate tiny notes and whisper-velocity artifacts
-            cleaned: list[pretty_midi.Note] = []
-            for n in inst.notes:
-                if (n.end - n.start) >= 0.05 and n.velocity >= 22:
-                    cleaned.append(n)
-            inst.notes = cleaned
-
-        # Tighten polyphony slightly to avoid dense clusters that sound noisy
-        pm = _clean_polyphony(pm, onset_window_sec=0.02, max_notes_per_onset=4)
-
-        # Light velocity smoothing (1,2,1 kernel)
-        for inst in pm.instruments:
-            if inst.notes and len(inst.notes) >= 3:
-                import numpy as _np  # local import to keep module load light
-                vel = _np.array([n.velocity for n in inst.notes], dtype=float)
-                kern = _np.array([1.0, 2.0, 1.0]) / 4.0
-                sm = _np.convolve(vel, kern, mode="same")
-                for n, v in zip(inst.notes, sm):
-                    n.velocity = int(max(1, min(127, round(v))))
-
-        # Write the enhanced MIDI
-        pm.write(output_mid_path)
+    # AI Enhancement 1: Much sharper velocity boost for louder/more prominent MIDI
+    for inst in pm.instruments:
+        if not inst.notes:
+            continue
+        _, _, _, vel = _note_fields(inst.notes)
+        # Expand low velocities significantly for better attack and presence,
+        # moderate boost for mid-range, slight for high, maximum for highest
+        gain = np.select([vel < 50, vel < 80, vel < 100], [1.8, 1.5, 1.3], default=1.2)
+        # Ensure we don't exceed MIDI limits
+        enhanced = np.clip((vel * gain).astype(int), 64, 127)
+        for note, v in zip(inst.notes, enhanced.tolist()):
+            note.velocity = v
+    
+    # AI Enhancement 2: Enhanced timing and musicality (more noticeable)
+    bpm_estimate = _estimate_bpm_from_midi(pm)
+    pm = _post_process_midi(
+        pm,
+        bpm_estimate,
+        humanize_timing_sec=0.008,  # tighter, more professional
+        humanize_velocity_range=15,   # more dynamic shaping for professional sound
+        add_sustain=True,            # richer
+    )
+    
+    # AI Enhancement 3: Very light note filtering (keep more notes)
+    pm = _limit_pitch_and_length(pm, pitch_min=21, pitch_max=108, min_duration_sec=0.045)  # Keep more notes
+    
+    # AI Enhancement 4: Professional velocity shaping for maximum impact
+    for inst in pm.instruments:
+        if not inst.notes:
+            continue
+        starts, ends, pitches, vel = _note_fields(inst.notes)
+        # 1. Note length-based velocity adjustment: short notes get a boost for
+        # crisp attack, long notes a slight boost for sustained presence
+        dur = ends - starts
+        vel = np.where(dur < 0.1, (vel * 1.15).astype(int),
+                       np.where(dur > 0.5, (vel * 1.05).astype(int), vel))
+        # 2. Pitch-based velocity refinement: bass presence, gentle boost for highs
+        vel = np.where(pitches < 48, (vel * 1.1).astype(int),
+                       np.where(pitches > 84, (vel * 1.05).astype(int), vel))
+        # 3. Ensure final velocity is within professional range
+        vel = np.clip(vel, 64, 127)
+        for note, v in zip(inst.notes, vel.tolist()):
+            note.velocity = v
+    
+    # AI Enhancement 5: Light chord filling to reduce gaps
+    pm = _fill_chord_gaps(pm, max_gap_sec=0.8, fill_velocity=60, max_fill_notes=2)
+    
+    # Final cleanup to reduce noise:
+    #  - gate ultra-short/low-velocity notes
+    #  - tighten polyphony per onset
+    #  - light velocity smoothing
+    for inst in pm.instruments:
+        # Gate tiny notes and whisper-velocity artifacts
+        starts, ends, _, vel = _note_fields(inst.notes)
+        keep = ((ends - starts) >= 0.05) & (vel >= 22)
+        if not keep.all():
+            notes = inst.notes
+            inst.notes = [notes[i] for i in np.flatnonzero(keep).tolist()]
+
+    # Tighten polyphony (and merge duplicate onsets) in one pass to avoid dense
+    # clusters that sound noisy
+    pm = _clean_polyphony(pm, onset_window_sec=0.02, max_notes_per_onset=4)
+
+    # Light velocity smoothing (1,2,1 kernel)
+    for inst in pm.instruments:
+        if inst.notes and len(inst.notes) >= 3:
+            _, _, _, vel = _note_fields(inst.notes)
+            kern = np.array([1.0, 2.0, 1.0]) / 4.0
+            sm = np.clip(np.rint(np.convolve(vel, kern, mode="same")), 1, 127).astype(int)
+            for n, v in zip(inst.notes, sm.tolist()):
+                n.velocity = v
+
+    # Write the enhanced MIDI
+    pm.write(output_mid_path)
 
-    # Load final MIDI for stats
-    pm_final = pretty_midi.PrettyMIDI(output_mid_path)
-    total_notes = sum(len(inst.notes) for inst in pm_final.instruments)
-    duration_sec = pm_final.get_end_time()
+    # Stats from the in-memory MIDI
+    total_notes = sum(len(inst.notes) for inst in pm.instruments)
+    duration_sec = pm.get_end_time()
     
     print(f"[HYBRID] Completed: {total_notes} notes, {duration_sec:.1f}s duration")
     print(f"[HYBRID] Enhanced with: MUCH SHARPER MIDI, light chord cleanup, enhanced timing, light chord filling")
@@ -2174,19 +2450,13 @@ def transcribe_to_midi_enhanced(
             up = client.files.create(wav_path)
             audio_url = up.urls['get']
             # Model + latest version
-            model = client.models.get(cloud_model)
-            version_id = model.latest_version.id
+            version_id = _replicate_latest_version(client, cloud_model)
             print(f"[ENHANCED] Using cloud model: {cloud_model} (version: {version_id})")
             # Prefer htdemucs 4-stem for best quality
             inp = {"audio": audio_url, "model": "htdemucs", "output_format": "wav"}
             pred = client.predictions.create(version=version_id, input=inp)
             # Poll
-            deadline = time.time() + 900
-            while pred.status not in ("succeeded", "failed", "canceled"):
-                if time.time() > deadline:
-                    raise TimeoutError("Cloud Demucs timed out")
-                time.sleep(2)
-                pred = client.predictions.get(pred.id)
+            pred = _poll_prediction(client, pred, 900, "Cloud Demucs timed out")
             if pred.status != "succeeded":
                 raise RuntimeError(f"Cloud Demucs failed: {pred.status}")
             if isinstance(pred.output, dict):
@@ -2194,12 +2464,8 @@ def transcribe_to_midi_enhanced(
                 for key in ("accompaniment", "other", "no_vocals"):
                     url = pred.output.get(key)
                     if isinstance(url, str) and url.startswith("http"):
-                        import requests as _rq
-                        r = _rq.get(url, timeout=180)
-                        r.raise_for_status()
-                        tmp = tempfile.mkstemp(suffix="_enh_stem.wav")[1]
-                        with open(tmp, "wb") as f:
-                            f.write(r.content)
+                        tmp = _mkstemp_path("_enh_stem.wav")
+                        _download_to_file(url, tmp, timeout=180)
                         stem_for_bp = tmp
                         print(f"[ENHANCED] Downloaded clean stem: {key}")
                         break
@@ -2210,22 +2476,13 @@ def transcribe_to_midi_enhanced(
             try:
                 inp2 = {"audio": audio_url, "model": "mdx23", "output_format": "wav"}
                 pred2 = client.predictions.create(version=version_id, input=inp2)
-                ddl = time.time() + 600
-                while pred2.status not in ("succeeded", "failed", "canceled"):
-                    if time.time() > ddl:
-                        raise TimeoutError("Cloud mdx23 timed out")
-                    time.sleep(2)
-                    pred2 = client.predictions.get(pred2.id)
+                pred2 = _poll_prediction(client, pred2, 600, "Cloud mdx23 timed out")
                 if pred2.status == "succeeded" and isinstance(pred2.output, dict):
                     for key in ("accompaniment", "other", "no_vocals"):
                         url = pred2.output.get(key)
                         if isinstance(url, str) and url.startswith("http"):
-                            import requests as _rq
-                            r = _rq.get(url, timeout=180)
-                            r.raise_for_status()
-                            tmp2 = tempfile.mkstemp(suffix="_enh_mdx23.wav")[1]
-                            with open(tmp2, "wb") as f:
-                                f.write(r.content)
+                            tmp2 = _mkstemp_path("_enh_mdx23.wav")
+                            _download_to_file(url, tmp2, timeout=180)
                             extra_stem_mdx = tmp2
                             print("[ENHANCED] Downloaded additional mdx23 stem")
                             break
@@ -2235,34 +2492,35 @@ def transcribe_to_midi_enhanced(
             # Strict: bubble up, do not fallback
             raise RuntimeError(f"Cloud-enhanced path failed: {e}")
 
-    # 3) Basic Pitch transcription (accurate profile)
-    tmp_mid = tempfile.mkstemp(suffix=".mid")[1]
-    print("[ENHANCED] Running Basic Pitch (accurate profile) on cleaned stem …")
-    stats_stem = transcribe_to_midi(stem_for_bp, tmp_mid, use_demucs=False, profile="accurate")
+    # 3) Basic Pitch transcription (accurate profile) of the cleaned stem, the original
+    # audio (for union richness) and the optional mdx23 stem. The passes are
+    # independent, so they run concurrently; their MIDIs live in a temp directory
+    # that is removed even if a pass fails.
+    with tempfile.TemporaryDirectory() as mid_dir:
+        tmp_mid = os.path.join(mid_dir, "stem.mid")
+        tmp_mid_orig = os.path.join(mid_dir, "orig.mid")
+        tmp_mid_mdx = os.path.join(mid_dir, "mdx23.mid") if extra_stem_mdx else None
+        print("[ENHANCED] Running Basic Pitch (accurate profile) on cleaned stem and original audio …")
+        with ThreadPoolExecutor(max_workers=3 if tmp_mid_mdx else 2) as ex:
+            f_stem = ex.submit(transcribe_to_midi, stem_for_bp, tmp_mid, use_demucs=False, profile="accurate")
+            f_orig = ex.submit(transcribe_to_midi, wav_path, tmp_mid_orig, use_demucs=False, profile="accurate")
+            f_mdx = None
+            if tmp_mid_mdx:
+                print("[ENHANCED] Running Basic Pitch on mdx23 stem for union merge …")
+                f_mdx = ex.submit(transcribe_to_midi, extra_stem_mdx, tmp_mid_mdx, use_demucs=False, profile="accurate")
+            stats_stem = f_stem.result()
+            stats_orig = f_orig.result()
+            if f_mdx is not None:
+                f_mdx.result()
+        sources = [pretty_midi.PrettyMIDI(tmp_mid), pretty_midi.PrettyMIDI(tmp_mid_orig)]
+        if tmp_mid_mdx:
+            sources.append(pretty_midi.PrettyMIDI(tmp_mid_mdx))
     bpm_estimate = stats_stem.get("bpm_estimate") or bpm_estimate
-
-    # Also transcribe original audio (for union richness)
-    tmp_mid_orig = tempfile.mkstemp(suffix=".mid")[1]
-    print("[ENHANCED] Running Basic Pitch on original audio for union merge …")
-    stats_orig = transcribe_to_midi(wav_path, tmp_mid_orig, use_demucs=False, profile="accurate")
     if bpm_estimate is None:
         bpm_estimate = stats_orig.get("bpm_estimate") or None
 
-    # Optionally transcribe mdx23 stem
-    tmp_mid_mdx = None
-    if extra_stem_mdx:
-        tmp_mid_mdx = tempfile.mkstemp(suffix=".mid")[1]
-        print("[ENHANCED] Running Basic Pitch on mdx23 stem for union merge …")
-        _ = transcribe_to_midi(extra_stem_mdx, tmp_mid_mdx, use_demucs=False, profile="accurate")
-
     # 4) Union-merge MIDIs from multiple sources
-    pm = pretty_midi.PrettyMIDI(tmp_mid)
-    pm_orig = pretty_midi.PrettyMIDI(tmp_mid_orig)
-    pm_merged = _merge_midis_union(pm, pm_orig)
-    if tmp_mid_mdx:
-        pm_mdx = pretty_midi.PrettyMIDI(tmp_mid_mdx)
-        pm_merged = _merge_midis_union(pm_merged, pm_mdx)
-    pm = pm_merged
+    pm = _merge_midis_union(sources)
     print("[ENHANCED] Refining MIDI against original audio …")
     pm = _refine_midi_against_audio(pm, wav_path, bpm=bpm_estimate or 120.0, max_poly=3)
     pm = _clean_polyphony(pm, onset_window_sec=0.03, max_notes_per_onset=3)
@@ -2275,25 +2533,19 @@ def transcribe_to_midi_enhanced(
     # 5) Expressive performance for clarity and loudness
     pm = expressive_enhance_midi(pm, humanize_timing_sec=0.008, humanize_velocity_range=18, sustain=True)
     # Final velocity normalization for maximum punch without clipping
-    if pm.instruments:
-        for inst in pm.instruments:
-            vmax = max((n.velocity for n in inst.notes), default=0)
-            if vmax > 0 and vmax < 127:
-                scale = 127.0 / float(vmax)
-                for n in inst.notes:
-                    n.velocity = int(max(1, min(127, round(n.velocity * scale))))
+    for inst in pm.instruments:
+        _, _, _, vel = _note_fields(inst.notes)
+        vmax = int(vel.max(initial=0))
+        if vmax > 0 and vmax < 127:
+            scaled = np.clip(np.rint(vel * (127.0 / float(vmax))), 1, 127).astype(int)
+            for n, v in zip(inst.notes, scaled.tolist()):
+                n.velocity = v
 
     # 6) Save
     pm.write(output_mid_path)
-    for p in [tmp_mid, tmp_mid_orig, tmp_mid_mdx or None]:
-        try:
-            if p: os.remove(p)
-        except Exception:
-            pass
 
-    pm_final = pretty_midi.PrettyMIDI(output_mid_path)
-    total_notes = sum(len(i.notes) for i in pm_final.instruments)
-    duration_sec = pm_final.get_end_time()
+    total_notes = sum(len(i.notes) for i in pm.instruments)
+    duration_sec = pm.get_end_time()
 
     return {
         "notes": float(total_notes),
@@ -2302,49 +2554,140 @@ def transcribe_to_midi_enhanced(
     }
 
 
+# Tempo HMM for _track_tempo: the beat fractions an inter-onset interval may span
+# (sixteenth .. whole note, incl. triplets) with prior weights
+_BEAT_RATIOS = np.array([0.25, 1.0 / 3.0, 0.5, 2.0 / 3.0, 0.75, 1.0, 1.5, 2.0, 3.0, 4.0])
+_BEAT_RATIO_LOGW = np.log(np.array([0.5, 0.3, 1.0, 0.3, 0.3, 1.0, 0.4, 0.8, 0.3, 0.4]))
+# Minimum fit of a tempo path: mean log-likelihood per interval relative to letting every
+# interval pick its own best tempo. Metrical onsets with up to ~20 ms jitter score above
+# this, unstructured (random) onsets around -0.5 .. -0.75.
+_TEMPO_MIN_FIT = -0.45
+
+
+def _track_tempo(onsets: np.ndarray, center_bpm: float, span: float = 0.2,
+                 tempo_sigma_oct: float = 0.04, band_oct: float = 0.16) -> Optional[np.ndarray]:
+    """
+    Viterbi decode a tempo path from note onsets. Hidden states are tempi in 0.5 BPM
+    steps within +/- span of center_bpm (a rough estimate, which also fixes the octave);
+    transitions are Gaussian in log2-tempo (tempo_sigma_oct octaves per step) and limited
+    to band_oct, so each step costs O(states x band). Each inter-onset interval is scored
+    by the best-fitting beat fraction of the state's beat period.
+    Returns the tempo (BPM) chosen for every interval, or None if there are too few
+    onsets or the path fits no better than unstructured timing (see _TEMPO_MIN_FIT).
+    """
+    onsets = np.sort(np.asarray(onsets, dtype=float))
+    if onsets.size < 2:
+        return None
+    # Collapse chords to one onset, skip rests longer than two seconds
+    onsets = onsets[np.concatenate(([True], np.diff(onsets) > 0.05))]
+    ioi = np.diff(onsets)
+    ioi = ioi[ioi <= 2.0]
+    if ioi.size < 4:
+        return None
+
+    grid = np.arange(np.floor(center_bpm * (1.0 - span) * 2.0) / 2.0, center_bpm * (1.0 + span) + 0.25, 0.5)
+    n_states = grid.size
+    if n_states < 2:
+        return None
+    log_tempo = np.log2(grid)
+    # Banded transitions: prev[s, k] is the k-th candidate predecessor of state s
+    k = min(int(np.ceil(band_oct / (log_tempo[1] - log_tempo[0]))), n_states - 1)
+    prev = np.arange(n_states)[:, None] + np.arange(-k, k + 1)[None, :]
+    valid = (prev >= 0) & (prev < n_states)
+    prev = np.clip(prev, 0, n_states - 1)
+    step = log_tempo[prev] - log_tempo[:, None]
+    trans = np.where(valid & (np.abs(step) <= band_oct), -0.5 * (step / tempo_sigma_oct) ** 2, -np.inf)
+
+    # Emission log-likelihoods for every (interval, state), in chunks to bound memory
+    beat = 60.0 / grid
+    sigma = np.maximum(0.02, 0.08 * ioi)
+    emit = np.empty((ioi.size, n_states))
+    for a in range(0, ioi.size, 512):
+        z = (ioi[a:a + 512, None, None] - beat[None, :, None] * _BEAT_RATIOS) / sigma[a:a + 512, None, None]
+        emit[a:a + 512] = (_BEAT_RATIO_LOGW - 0.5 * z * z).max(axis=2)
+
+    rows = np.arange(n_states)
+    delta = emit[0].copy()
+    back = np.empty((ioi.size, n_states), dtype=np.intp)
+    for n in range(1, ioi.size):
+        scores = delta[prev] + trans
+        best = scores.argmax(axis=1)
+        back[n] = prev[rows, best]
+        delta = scores[rows, best] + emit[n]
+
+    path = np.empty(ioi.size, dtype=np.intp)
+    path[-1] = int(delta.argmax())
+    for n in range(ioi.size - 1, 0, -1):
+        path[n - 1] = back[n, path[n]]
+
+    fit = emit[np.arange(ioi.size), path].mean() - emit.max(axis=1).mean()
+    if fit < _TEMPO_MIN_FIT:
+        return None
+    return grid[path]
+
+
 def _estimate_bpm_from_midi(pm: pretty_midi.PrettyMIDI) -> Optional[float]:
-    """Estimate BPM from MIDI note timing patterns."""
+    """
+    Estimate BPM from MIDI note timing patterns: a rough histogram/autocorrelation
+    estimate, refined by the median of the Viterbi tempo path when that path fits.
+    Only the global BPM is returned; quantization still uses a fixed grid.
+    """
     if not pm.instruments or not pm.instruments[0].notes:
         return None
     
     try:
-        # Get all note onsets
-        onsets = [note.start for inst in pm.instruments for note in inst.notes]
-        if len(onsets) < 4:
+        # Get all note onsets, sorted
+        onsets = np.sort(np.fromiter((note.start for inst in pm.instruments for note in inst.notes), dtype=float))
+        if onsets.size < 4:
             return None
         
-        # Sort and get time differences
-        onsets.sort()
-        intervals = [onsets[i+1] - onsets[i] for i in range(len(onsets)-1)]
-        
-        # Filter out very short intervals (likely same chord)
-        intervals = [i for i in intervals if i > 0.05]
-        if not intervals:
+        rough = _rough_bpm(onsets)
+        if rough is None:
             return None
         
-        # Find common intervals (likely beat patterns)
-        from collections import Counter
-        interval_counts = Counter()
-        for interval in intervals:
-            # Round to nearest 0.1 second for grouping
-            rounded = round(interval, 1)
-            interval_counts[rounded] += 1
-        
-        # Get most common interval
-        most_common_interval = max(interval_counts.items(), key=lambda x: x[1])[0]
-        
-        # Convert interval to BPM (60 seconds / interval = BPM)
-        if most_common_interval > 0:
-            bpm = 60.0 / most_common_interval
-            # Constrain to reasonable range
+        # Follow tempo drift around the rough estimate; keep it if the path doesn't fit
+        path = _track_tempo(onsets, rough)
+        if path is not None:
+            bpm = float(np.median(path))
             if 60 <= bpm <= 200:
                 return bpm
-        
-        return None
+        return rough
     except Exception:
         return None
 
 
+def _rough_bpm(onsets: np.ndarray) -> Optional[float]:
+    """Coarse BPM from sorted onsets: the most common interval, else onset autocorrelation."""
+    # Time differences, filtering out very short intervals (likely same chord)
+    intervals = np.diff(onsets)
+    intervals = intervals[intervals > 0.05]
+    if not intervals.size:
+        return None
+    
+    # Most common interval on a 0.1 second grid (likely beat pattern)
+    most_common_interval = np.bincount(np.rint(intervals * 10.0).astype(np.int64)).argmax() / 10.0
+    
+    # Convert interval to BPM (60 seconds / interval = BPM)
+    if most_common_interval > 0:
+        bpm = 60.0 / most_common_interval
+        # Constrain to reasonable range
+        if 60 <= bpm <= 200:
+            return float(bpm)
+    
+    # Otherwise take the strongest periodicity of the onset envelope (10 ms frames)
+    # between 0.3 and 1.0 seconds, i.e. 60-200 BPM, via FFT autocorrelation
+    env = np.bincount(np.rint(onsets * 100.0).astype(np.int64)).astype(float)
+    env -= env.mean()
+    lo, hi = 30, min(100, env.size - 1)
+    if hi > lo:
+        ac = np.fft.irfft(np.abs(np.fft.rfft(env, 2 * env.size)) ** 2)[: env.size]
+        lag = lo + int(np.argmax(ac[lo:hi + 1]))
+        if ac[lag] > 0:
+            return 6000.0 / lag
+    
+    return None
+
+
 def _fill_chord_gaps(pm: pretty_midi.PrettyMIDI, max_gap_sec: float = 0.8, fill_velocity: int = 60, max_fill_notes: int = 2) -> pretty_midi.PrettyMIDI:
     """
     Light chord filling to reduce gaps between chords.
@@ -2362,62 +2705,63 @@ def _fill_chord_gaps(pm: pretty_midi.PrettyMIDI, max_gap_sec: float = 0.8, fill_
     if not pm.instruments:
         return pm
     
-    # Get all note onsets and sort them
-    all_notes = []
-    for inst in pm.instruments:
-        for note in inst.notes:
-            all_notes.append((note.start, note.end, note.pitch, inst))
-    
-    if len(all_notes) < 2:
+    # Gather all notes as parallel arrays, with the owning instrument's index
+    notes = [note for inst in pm.instruments for note in inst.notes]
+    if len(notes) < 2:
         return pm
+    starts, ends, pitches, _ = _note_fields(notes)
+    inst_ids = np.repeat(np.arange(len(pm.instruments)), [len(inst.notes) for inst in pm.instruments])
+    
+    # Sort by start time (stable, so simultaneous notes keep their original order)
+    order = np.argsort(starts, kind="stable")
+    starts, ends, pitches, inst_ids = starts[order], ends[order], pitches[order], inst_ids[order]
     
-    # Sort by start time
-    all_notes.sort(key=lambda x: x[0])
+    # A gap is silence after every earlier note has ended, so measure it from the
+    # running maximum of note ends rather than the previous note's end alone
+    sounding_end = np.maximum.accumulate(ends)
+    gaps = starts[1:] - sounding_end[:-1]
     
-    # Find gaps and add light fill chords
-    for i in range(len(all_notes) - 1):
-        current_end = all_notes[i][1]
-        next_start = all_notes[i + 1][0]
+    # Add light fill chords only where the gap is too long
+    for i in np.flatnonzero(gaps > max_gap_sec).tolist():
+        current_end = float(sounding_end[i])
+        next_start = float(starts[i + 1])
         gap = next_start - current_end
+        # Calculate fill time (middle of the gap)
+        fill_time = current_end + (gap / 2)
         
-        # If gap is too long, add a light fill chord
-        if gap > max_gap_sec:
-            # Calculate fill time (middle of the gap)
-            fill_time = current_end + (gap / 2)
-            
-            # Get the instrument from the current note
-            current_inst = all_notes[i][3]
-            
-            # Create a light fill chord (1-2 notes)
-            num_fill_notes = min(max_fill_notes, 2)
-            
-            # Use nearby pitches for the fill chord
-            current_pitch = all_notes[i][2]
-            next_pitch = all_notes[i + 1][2]
-            
-            # Create fill notes with nearby pitches
-            fill_pitches = []
-            if num_fill_notes == 1:
-                # Single note: use average of surrounding pitches
-                avg_pitch = int((current_pitch + next_pitch) / 2)
-                fill_pitches.append(avg_pitch)
-            else:
-                # Two notes: use current and next pitch
-                fill_pitches.append(current_pitch)
-                fill_pitches.append(next_pitch)
-            
-            # Add fill notes
-            for pitch in fill_pitches:
-                # Ensure pitch is in valid range
-                if 21 <= pitch <= 108:
-                    # Create a short, subtle fill note
-                    fill_note = pretty_midi.Note(
-                        velocity=fill_velocity,
-                        pitch=pitch,
-                        start=fill_time,
-                        end=min(fill_time + 0.3, next_start - 0.1)  # Short duration, don't overlap next note
-                    )
-                    current_inst.notes.append(fill_note)
+        # Get the instrument from the current note
+        current_inst = pm.instruments[int(inst_ids[i])]
+        
+        # Create a light fill chord (1-2 notes)
+        num_fill_notes = min(max_fill_notes, 2)
+        
+        # Use nearby pitches for the fill chord
+        current_pitch = int(pitches[i])
+        next_pitch = int(pitches[i + 1])
+        
+        # Create fill notes with nearby pitches
+        fill_pitches = []
+        if num_fill_notes == 1:
+            # Single note: use average of surrounding pitches
+            avg_pitch = int((current_pitch + next_pitch) / 2)
+            fill_pitches.append(avg_pitch)
+        else:
+            # Two notes: use current and next pitch
+            fill_pitches.append(current_pitch)
+            fill_pitches.append(next_pitch)
+        
+        # Add fill notes
+        for pitch in fill_pitches:
+            # Ensure pitch is in valid range
+            if 21 <= pitch <= 108:
+                # Create a short, subtle fill note
+                fill_note = pretty_midi.Note(
+                    velocity=fill_velocity,
+                    pitch=pitch,
+                    start=fill_time,
+                    end=min(fill_time + 0.3, next_start - 0.1)  # Short duration, don't overlap next note
+                )
+                current_inst.notes.append(fill_note)
     
     return pm
 
@@ -2443,139 +2787,90 @@ def transcribe_to_midi_professional(
     print(f"[PROFESSIONAL] Starting professional transcription of: {input_wav_path}")
     print(f"[PROFESSIONAL] Using multi-pass Basic Pitch + advanced AI enhancement")
     
-    # Use Basic Pitch to produce raw MIDI with professional settings
-    with tempfile.TemporaryDirectory() as tmpdir:
-        try:
-            from basic_pitch.inference import predict_and_save, ICASSP_2022_MODEL_PATH  # type: ignore
-        except Exception as e:
-            raise RuntimeError(
-                "Basic Pitch is not installed. Install with: \n"
-                "  pip install basic-pitch\n"
-                "PTI fallback has been removed as it was not producing good results."
-            )
-        
-        # Call Basic Pitch with version-tolerant wrapper
-        try:
-            predict_and_save(
-                [input_wav_path], tmpdir, True, False, False, False, ICASSP_2022_MODEL_PATH,
-            )
-        except TypeError:
-            predict_and_save(
-                [input_wav_path], True, False, False, False, ICASSP_2022_MODEL_PATH, tmpdir,
-            )
-
-        # Find the produced MIDI file
-        midi_candidates = [
-            os.path.join(tmpdir, f) for f in os.listdir(tmpdir) if f.lower().endswith(".mid") or f.lower().endswith(".midi")
-        ]
-        if not midi_candidates:
-            raise RuntimeError("Basic Pitch did not produce a MIDI file")
-        temp_midi = midi_candidates[0]
+    # Basic Pitch with the process-wide cached model, MIDI kept in memory
+    pm = _basic_pitch_transcribe(input_wav_path)
+    print(f"[PROFESSIONAL] Applying professional AI enhancement...")
+    
+    # Professional Enhancement 1: Advanced velocity shaping for studio quality
+    for inst in pm.instruments:
+        if not inst.notes:
+            continue
+        _, _, _, vel = _note_fields(inst.notes)
+        # Multi-tier velocity enhancement based on musical context: dramatically
+        # expand very low velocities for presence, significant boost for low-mid,
+        # moderate for mid, gentle for high
+        gain = np.select([vel < 45, vel < 70, vel < 90], [2.0, 1.6, 1.4], default=1.25)
+        # Ensure professional velocity range (no whisper-quiet notes)
+        enhanced = np.clip((vel * gain).astype(int), 70, 127)
+        for note, v in zip(inst.notes, enhanced.tolist()):
+            note.velocity = v
+    
+    # Professional Enhancement 2: Intelligent chord cleanup
+    pm = _clean_polyphony(pm, onset_window_sec=0.015, max_notes_per_onset=5)  # Balanced cleanup
+    
+    # Professional Enhancement 3: Advanced timing and musicality
+    bpm_estimate = _estimate_bpm_from_midi(pm)
+    pm = _post_process_midi(
+        pm,
+        bpm_estimate,
+        humanize_timing_sec=0.006,  # Very tight, professional timing
+        humanize_velocity_range=20,   # Maximum dynamic range for professional sound
+        add_sustain=True,            # Rich sustain for professional feel
+    )
+    
+    # Professional Enhancement 4: Sophisticated note filtering
+    pm = _limit_pitch_and_length(pm, pitch_min=24, pitch_max=108, min_duration_sec=0.04)  # Keep more notes
+    
+    # Professional Enhancement 5: Advanced velocity shaping for maximum impact
+    for inst in pm.instruments:
+        if not inst.notes:
+            continue
+        starts, ends, pitches, vel = _note_fields(inst.notes)
+        # 1. Musical context velocity adjustment: crisp attack for short notes,
+        # sustained presence for long notes
+        dur = ends - starts
+        vel = np.where(dur < 0.08, (vel * 1.2).astype(int),
+                       np.where(dur > 0.8, (vel * 1.1).astype(int), vel))
+        # 2. Pitch-based professional shaping: strong bass presence below C2,
+        # gentle bass boost below C4, clarity boost above C7
+        gain = np.select([pitches < 36, pitches < 60, pitches > 96], [1.15, 1.1, 1.08], default=1.0)
+        vel = (vel * gain).astype(int)
+        # 3. Professional velocity range enforcement
+        vel = np.clip(vel, 70, 127)
+        for note, v in zip(inst.notes, vel.tolist()):
+            note.velocity = v
+    
+    # Professional Enhancement 6: Musical phrase filling
+    pm = _fill_chord_gaps(pm, max_gap_sec=1.0, fill_velocity=75, max_fill_notes=3)
+    
+    # Professional Enhancement 7: Final cleanup and polish
+    for inst in pm.instruments:
+        # Remove any remaining artifacts
+        starts, ends, _, vel = _note_fields(inst.notes)
+        keep = ((ends - starts) >= 0.04) & (vel >= 70)
+        if not keep.all():
+            notes = inst.notes
+            inst.notes = [notes[i] for i in np.flatnonzero(keep).tolist()]
+
+    # Final polyphony cleanup for professional sound
+    pm = _clean_polyphony(pm, onset_window_sec=0.015, max_notes_per_onset=4)
+
+    # Professional velocity smoothing for natural feel: 5-point kernel, rounded and
+    # clamped in the same vector pass, then written back once
+    kern = np.array([1.0, 2.0, 4.0, 2.0, 1.0]) / 10.0
+    for inst in pm.instruments:
+        if inst.notes and len(inst.notes) >= 5:
+            _, _, _, vel = _note_fields(inst.notes)
+            sm = np.clip(np.rint(np.convolve(vel, kern, mode="same")), 70, 127).astype(int)
+            for n, v in zip(inst.notes, sm.tolist()):
+                n.velocity = v
 
-        print(f"[PROFESSIONAL] Basic Pitch MIDI generated: {temp_midi}")
-        print(f"[PROFESSIONAL] Applying professional AI enhancement...")
+    # Write the professionally enhanced MIDI
+    pm.write(output_mid_path)
 
-        # Load the Basic Pitch output for professional enhancement
-        pm = pretty_midi.PrettyMIDI(temp_midi)
-        
-        # Professional Enhancement 1: Advanced velocity shaping for studio quality
-        for inst in pm.instruments:
-            for note in inst.notes:
-                # Studio-quality velocity enhancement
-                original_velocity = note.velocity
-                
-                # Multi-tier velocity enhancement based on musical context
-                if original_velocity < 45:
-                    # Dramatically expand very low velocities for presence
-                    enhanced_velocity = int(original_velocity * 2.0)
-                elif original_velocity < 70:
-                    # Significant boost for low-mid velocities
-                    enhanced_velocity = int(original_velocity * 1.6)
-                elif original_velocity < 90:
-                    # Moderate boost for mid velocities
-                    enhanced_velocity = int(original_velocity * 1.4)
-                else:
-                    # Gentle boost for high velocities
-                    enhanced_velocity = int(original_velocity * 1.25)
-                
-                # Ensure professional velocity range (no whisper-quiet notes)
-                note.velocity = min(127, max(70, enhanced_velocity))
-        
-        # Professional Enhancement 2: Intelligent chord cleanup
-        pm = _clean_polyphony(pm, onset_window_sec=0.015, max_notes_per_onset=5)  # Balanced cleanup
-        
-        # Professional Enhancement 3: Advanced timing and musicality
-        bpm_estimate = _estimate_bpm_from_midi(pm)
-        pm = _post_process_midi(
-            pm,
-            bpm_estimate,
-            humanize_timing_sec=0.006,  # Very tight, professional timing
-            humanize_velocity_range=20,   # Maximum dynamic range for professional sound
-            add_sustain=True,            # Rich sustain for professional feel
-        )
-        
-        # Professional Enhancement 4: Sophisticated note filtering
-        pm = _limit_pitch_and_length(pm, pitch_min=24, pitch_max=108, min_duration_sec=0.04)  # Keep more notes
-        
-        # Professional Enhancement 5: Advanced velocity shaping for maximum impact
-        for inst in pm.instruments:
-            for note in inst.notes:
-                # Professional velocity refinement
-                current_velocity = note.velocity
-                
-                # 1. Musical context velocity adjustment
-                note_duration = note.end - note.start
-                if note_duration < 0.08:
-                    # Crisp attack for short notes
-                    current_velocity = int(current_velocity * 1.2)
-                elif note_duration > 0.8:
-                    # Sustained presence for long notes
-                    current_velocity = int(current_velocity * 1.1)
-                
-                # 2. Pitch-based professional shaping
-                if note.pitch < 36:  # Very low notes
-                    current_velocity = int(current_velocity * 1.15)  # Strong bass presence
-                elif note.pitch < 60:  # Low-mid notes
-                    current_velocity = int(current_velocity * 1.1)   # Gentle bass boost
-                elif note.pitch > 96:  # Very high notes
-                    current_velocity = int(current_velocity * 1.08)  # Clarity boost
-                
-                # 3. Professional velocity range enforcement
-                note.velocity = max(70, min(127, current_velocity))
-        
-        # Professional Enhancement 6: Musical phrase filling
-        pm = _fill_chord_gaps(pm, max_gap_sec=1.0, fill_velocity=75, max_fill_notes=3)
-        
-        # Professional Enhancement 7: Final cleanup and polish
-        for inst in pm.instruments:
-            # Remove any remaining artifacts
-            cleaned: list[pretty_midi.Note] = []
-            for n in inst.notes:
-                if (n.end - n.start) >= 0.04 and n.velocity >= 70:
-                    cleaned.append(n)
-            inst.notes = cleaned
-
-        # Final polyphony cleanup for professional sound
-        pm = _clean_polyphony(pm, onset_window_sec=0.015, max_notes_per_onset=4)
-
-        # Professional velocity smoothing for natural feel
-        for inst in pm.instruments:
-            if inst.notes and len(inst.notes) >= 5:
-                import numpy as _np  # local import to keep module load light
-                vel = _np.array([n.velocity for n in inst.notes], dtype=float)
-                # Use 5-point smoothing kernel for professional feel
-                kern = _np.array([1.0, 2.0, 4.0, 2.0, 1.0]) / 10.0
-                sm = _np.convolve(vel, kern, mode="same")
-                for n, v in zip(inst.notes, sm):
-                    n.velocity = int(max(70, min(127, round(v))))
-
-        # Write the professionally enhanced MIDI
-        pm.write(output_mid_path)
-
-    # Load final MIDI for stats
-    pm_final = pretty_midi.PrettyMIDI(output_mid_path)
-    total_notes = sum(len(inst.notes) for inst in pm_final.instruments)
-    duration_sec = pm_final.get_end_time()
+    # Stats from the in-memory MIDI that was just written
+    total_notes = sum(len(inst.notes) for inst in pm.instruments)
+    duration_sec = pm.get_end_time()
     
     print(f"[PROFESSIONAL] Completed: {total_notes} notes, {duration_sec:.1f}s duration")
     print(f"[PROFESSIONAL] Enhanced with: Studio-quality velocity, professional timing, musical expression, rich sustain")
@@ -3,82 +3,42 @@
 Test script for the improved Great Quality separation system
 """
 
-import requests
-import time
-import os
+from sep_client import SESSION, START_URL, TEST_FILE, get_test_bytes, upload, wait_for_job
 
-def test_separation():
+def test_separation(session):
     """Test the improved separation endpoint"""
     print("🧪 Testing Improved Great Quality Separation")
     print("=" * 50)
 
-    # Test file
-    test_file = "01 - Dreamlover - Mariah Carey.mp3"
-
-    if not os.path.exists(test_file):
-        print(f"❌ Test file {test_file} not found")
-        return
-
-    print(f"✅ Using test file: {test_file}")
+    payload = get_test_bytes(TEST_FILE)
+    print(f"✅ Using test file: {TEST_FILE}")
 
     # Test the separation endpoint
-    url = "http://localhost:8010/separate_start"
-
-    try:
-        with open(test_file, 'rb') as f:
-            files = {'file': (test_file, f, 'audio/mpeg')}
-            response = requests.post(url, files=files)
-
-        if response.status_code == 200:
-            result = response.json()
-            job_id = result.get('job_id')
-            print(f"✅ Separation job started. Job ID: {job_id}")
+    response = upload(START_URL, TEST_FILE, 'audio/mpeg', data={'mode': 'great'}, payload=payload, session=session)
+    assert response.status_code == 200, f"Failed to start separation: {response.status_code} {response.text}"
 
-            # Check job status multiple times with longer timeout
-            for i in range(20):  # Check for up to 20 minutes
-                time.sleep(10)  # Check every 10 seconds
-                print(f"⏳ Check {i+1}/20 ({(i+1)*10}s elapsed)...")
-                
-                status_url = f"http://localhost:8010/job/{job_id}"
-                try:
-                    status_response = requests.get(status_url)
-                    if status_response.status_code == 200:
-                        status_data = status_response.json()
-                        status = status_data.get('status')
-                        progress = status_data.get('progress', 0)
-                        
-                        print(f"   Status: {status}, Progress: {progress:.1%}")
-                        
-                        # Check for separation files
-                        if status_data.get('instrumental_url'):
-                            print(f"   ✅ Instrumental: {status_data.get('instrumental_url')}")
-                        if status_data.get('vocals_url'):
-                            print(f"   ✅ Vocals: {status_data.get('vocals_url')}")
-                        if status_data.get('backend'):
-                            print(f"   Backend: {status_data.get('backend')}")
-                        
-                        if status == 'done':
-                            print("✅ Separation completed successfully!")
-                            return
-                        elif status == 'error':
-                            print(f"❌ Separation failed: {status_data.get('error', 'Unknown error')}")
-                            return
-                    else:
-                        print(f"⚠️  Status check failed: {status_response.status_code}")
+    job_id = response.json().get('job_id')
+    print(f"✅ Separation job started. Job ID: {job_id}")
 
-                except Exception as e:
-                    print(f"⚠️  Error checking status: {e}")
+    # Wait for the job, printing each status change
+    status, status_data = wait_for_job(job_id, timeout=200, poll_interval=10, session=session)
 
-            print("⏰ Checked for 20 minutes, separation still in progress")
+    # Check for separation files
+    if status_data.get('instrumental_url'):
+        print(f"   ✅ Instrumental: {status_data.get('instrumental_url')}")
+    if status_data.get('vocals_url'):
+        print(f"   ✅ Vocals: {status_data.get('vocals_url')}")
+    if status_data.get('backend'):
+        print(f"   Backend: {status_data.get('backend')}")
 
-        else:
-            print(f"❌ Failed to start separation: {response.status_code}")
-            print(f"   Response: {response.text}")
-
-    except Exception as e:
-        print(f"❌ Error: {e}")
+    assert status != 'timeout', "Separation still in progress after 200s"
+    assert status == 'done', f"Separation failed: {status_data.get('error', 'Unknown error')}"
+    print("✅ Separation completed successfully!")
 
 if __name__ == "__main__":
-    test_separation()
-
-
+    try:
+        test_separation(SESSION)
+    except (AssertionError, OSError) as e:
+        print(f"❌ {e}")
+    finally:
+        SESSION.close()
@@ -7,7 +7,7 @@ import sys
 import os
 sys.path.append('server')
 
-from inference import separate_audio, separate_audio_pro, separate_audio_fast_overlap
+from inference import separate_audio_all_modes
 
 def test_separation_functions():
     """Test the separation functions directly"""
@@ -23,18 +23,18 @@ def test_separation_functions():
     print(f"✅ Using test file: {test_file}")
     
     try:
-        print("\n1️⃣ Testing Standard Mode...")
-        inst, voc = separate_audio(test_file)
+        # One WAV conversion of the test file, shared by all three modes
+        (inst, voc), (inst_pro, voc_pro), (inst_speed, voc_speed) = separate_audio_all_modes(test_file)
+        
+        print("\n1️⃣ Standard Mode...")
         print(f"   Instrumental: {inst}")
         print(f"   Vocals: {voc}")
         
-        print("\n2️⃣ Testing Pro Mode...")
-        inst_pro, voc_pro = separate_audio_pro(test_file)
+        print("\n2️⃣ Pro Mode...")
         print(f"   Instrumental: {inst_pro}")
         print(f"   Vocals: {voc_pro}")
         
-        print("\n3️⃣ Testing Speed Mode...")
-        inst_speed, voc_speed = separate_audio_fast_overlap(test_file)
+        print("\n3️⃣ Speed Mode...")
         print(f"   Instrumental: {inst_speed}")
         print(f"   Vocals: {voc_speed}")
         